@@ -0,0 +1,200 @@
+"""Offline batch mode: answer every prompt in a JSONL file.
+
+Run: python batch.py prompts.jsonl answers.jsonl --concurrency 8 --rate 3
+
+Each input line is a JSON object; the prompt is read from --field (default
+"prompt"). Output lines are written in input order as soon as they are
+ready, and a checkpoint next to the output records how far the run got, so
+rerunning the same command after a crash picks up where it stopped.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+from router import BackendRouter, BackendUnavailable, CircuitBreaker, CircuitOpen, retryable
+
+# -------------------- RATE LIMITING --------------------
+class TokenBucket:
+    """Allow ``rate`` calls per second on average, with bursts up to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# -------------------- CHECKPOINT --------------------
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"input_offset": 0, "output_size": 0, "lines_done": 0, "ok": 0, "errors": 0}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+# -------------------- BATCH RUNNER --------------------
+class BatchRunner:
+    def __init__(self, field="prompt", rate=3.0, retries=3, backoff=1.0, concurrency=8):
+        self.field = field
+        self.bucket = TokenBucket(rate) if rate > 0 else None
+        self.retries = retries
+        self.backoff = backoff
+        # Deadline and breaker only: retries happen in call_upstream, one rate-limiter token per attempt
+        self.router = BackendRouter("openai", budget=engine.OPENAI_BUDGET, retries=0,
+                                    breaker=CircuitBreaker(threshold=5, cooldown=30), max_workers=concurrency)
+
+    def call_upstream(self, prompt):
+        """OpenAI call behind the rate limiter, retried with jittered exponential backoff.
+
+        Each attempt has the router's budget as its timeout. While the breaker
+        is open the row waits for it to close instead of failing, so an outage
+        pauses the run rather than filling the output with error rows. The
+        semantic cache is skipped: it would grow with every row, and its lookups
+        get slower as it does, so memory and time per row would not stay flat.
+        """
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                return self.router.call(lambda timeout: engine.ask_openai(prompt, timeout=timeout, semantic=False))
+            except CircuitOpen:
+                time.sleep(max(self.router.breaker.snapshot()["retry_in_s"], self.backoff))
+            except BackendUnavailable as e:
+                if attempt == self.retries or (e.__cause__ is not None and not retryable(e.__cause__)):
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+
+    def process(self, line_no, line):
+        """Answer one input line; returns the output record"""
+        start = time.perf_counter()
+        record = {"line": line_no}
+        try:
+            row = json.loads(line)
+            for key in ("id", "request_id"):
+                if key in row:
+                    record[key] = row[key]
+            prompt = str(row.get(self.field, "")).strip()
+            if not prompt:
+                raise ValueError(f"missing '{self.field}'")
+            if engine.openai_enabled():
+                # Same path as get_chatbot_response, but upstream errors are retried, then reported
+                record["response"] = engine.response_cache.get_or_compute(
+                    prompt, engine.OPENAI_PARAMS, lambda: self.call_upstream(prompt))
+                record["source"] = "openai"
+            else:
+                record["response"] = engine.get_fallback_response(prompt)
+                record["source"] = "fallback"
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return record
+
+    def run(self, input_path, output_path, concurrency=8, checkpoint_every=100):
+        checkpoint_path = f"{output_path}.ckpt"
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint["lines_done"]:
+            if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint["output_size"]:
+                raise SystemExit(f"{output_path} does not match {checkpoint_path}; rerun with --restart")
+            print(f"Resuming after line {checkpoint['lines_done']}", file=sys.stderr)
+
+        window = concurrency * 4  # bounds memory: at most this many lines in flight
+        in_flight = {}            # line_no -> (future, input offset after the line)
+        start = time.perf_counter()
+        last_report = start
+        done_this_run = 0
+
+        with open(input_path, "rb") as source, open(output_path, "ab") as sink, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Drop output written after the last checkpoint; those lines are redone
+            sink.truncate(checkpoint["output_size"])
+            source.seek(checkpoint["input_offset"])
+            next_line = line_no = checkpoint["lines_done"]
+
+            def write_oldest():
+                nonlocal next_line, done_this_run, last_report
+                future, offset = in_flight.pop(next_line)
+                record = future.result()
+                sink.write((json.dumps(record, ensure_ascii=False) + "\n").encode())
+                next_line += 1
+                done_this_run += 1
+                checkpoint["errors" if "error" in record else "ok"] += 1
+                if next_line % checkpoint_every == 0:
+                    sink.flush()
+                    checkpoint.update(input_offset=offset, output_size=sink.tell(), lines_done=next_line)
+                    save_checkpoint(checkpoint_path, checkpoint)
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    last_report = now
+                    print(f"{next_line} lines, {done_this_run / (now - start):.1f} rows/s, "
+                          f"{checkpoint['errors']} errors", file=sys.stderr)
+
+            while True:
+                line = source.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                in_flight[line_no] = (executor.submit(self.process, line_no + 1, line), source.tell())
+                line_no += 1
+                while len(in_flight) >= window:
+                    write_oldest()
+            while in_flight:
+                write_oldest()
+
+            sink.flush()
+            checkpoint.update(input_offset=source.tell(), output_size=sink.tell(), lines_done=next_line)
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - start
+        summary = {"lines": checkpoint["lines_done"], "this_run": done_this_run, "ok": checkpoint["ok"],
+                   "errors": checkpoint["errors"], "seconds": round(elapsed, 2),
+                   "rows_per_sec": round(done_this_run / elapsed, 1) if elapsed else 0.0}
+        print(json.dumps(summary), file=sys.stderr)
+        return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of prompts")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--field", default="prompt", help="JSON key holding the prompt")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=3.0, help="upstream requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.restart:
+        for path in (args.output, f"{args.output}.ckpt"):
+            if os.path.exists(path):
+                os.remove(path)
+    BatchRunner(args.field, args.rate, args.retries, concurrency=args.concurrency).run(
+        args.input, args.output, args.concurrency)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare the AST calculator with the old strip-and-eval math branch.
+
+Run: python benchmarks/bench_calculator.py [expressions]
+Reports expressions/sec for the old eval path, calculator.answer (cold and
+with the compiled-expression cache warm) and calculator.evaluate_many.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator
+
+def old_calculate(user_input):
+    """The math branch before calculator.py"""
+    try:
+        if '+' in user_input or '-' in user_input or '*' in user_input or '/' in user_input:
+            result = eval(''.join([c for c in user_input if c in '0123456789+-*/.() ']))
+            return f"The answer is: {result} 🧮"
+    except:
+        return "I can help with basic math!"
+    return None
+
+def synthetic_expressions(count, rng, distinct):
+    """``count`` expressions drawn from ``distinct`` unique ones, in a few shapes"""
+    shapes = ["{} + {}", "{} * {} - {}", "({} + {}) / {}", "{} - {} * {} + {}", "{} ** 2 + {}"]
+    pool = []
+    for _ in range(distinct):
+        shape = rng.choice(shapes)
+        pool.append(shape.format(*(rng.randint(1, 999) for _ in range(shape.count("{}")))))
+    return [rng.choice(pool) for _ in range(count)]
+
+def rate(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - start)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(7)
+    unique = synthetic_expressions(count, rng, count)
+    repeated = synthetic_expressions(count, rng, 500)
+    messages = [f"what is {expression}?" for expression in unique]
+
+    print(f"{'path':<38} {'expr/s':>12}")
+    print(f"{'old eval (unique messages)':<38} {rate(old_calculate, messages):>12,.0f}")
+    calculator.compile_expression.cache_clear()
+    print(f"{'calculator.answer (unique messages)':<38} {rate(calculator.answer, messages):>12,.0f}")
+    print(f"{'old eval (bare, 500 distinct)':<38} {rate(eval, repeated):>12,.0f}")
+    calculator.compile_expression.cache_clear()
+    print(f"{'calculator.evaluate (500 distinct)':<38} {rate(calculator.evaluate, repeated):>12,.0f}")
+    for label, items in (("unique", unique), ("500 distinct", repeated)):
+        calculator.compile_expression.cache_clear()
+        start = time.perf_counter()
+        calculator.evaluate_many(items)
+        print(f"{'evaluate_many (' + label + ')':<38} {len(items) / (time.perf_counter() - start):>12,.0f}")
+
+    start = time.perf_counter()
+    print(f"9**9**9 -> {calculator.answer('9**9**9')!r} in {(time.perf_counter() - start) * 1e6:.0f} us")
+
+if __name__ == "__main__":
+    main()
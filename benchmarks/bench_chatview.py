@@ -0,0 +1,82 @@
+"""Per-message insert cost over a long session: plain ScrolledText vs ChatView.
+
+Run: python benchmarks/bench_chatview.py [messages]
+Needs a display; on a headless machine use: xvfb-run python benchmarks/bench_chatview.py
+Prints the average cost per message for each slice of the run. The old log
+slows down as the widget grows; the bounded view should stay flat.
+"""
+import os
+import random
+import sys
+import time
+import tkinter as tk
+from tkinter import END, scrolledtext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatview import ChatView
+
+SLICES = 10
+PER_TICK = 2  # a question and its answer usually land in the same tick
+
+def messages(count, rng):
+    words = "the quick brown fox jumps over a lazy dog while the bot answers every single question".split()
+    for i in range(count):
+        text = " ".join(rng.choices(words, k=rng.randint(5, 60)))
+        yield f"👤 You: {text}\n" if i % 2 == 0 else f"🤖 Bot: {text}\n\n"
+
+def run_plain(root, count):
+    """The old append_text: toggle state, insert, toggle back, scroll, for every message"""
+    log = scrolledtext.ScrolledText(root, wrap="word", state="disabled")
+    log.pack()
+    timings = []
+    start = time.perf_counter()
+    for i, text in enumerate(messages(count, random.Random(1)), 1):
+        log.configure(state="normal")
+        log.insert(END, text)
+        log.configure(state="disabled")
+        log.see(END)
+        if i % PER_TICK == 0:
+            root.update()
+        if i % (count // SLICES) == 0:
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+    log.destroy()
+    return timings
+
+def run_view(root, count):
+    view = ChatView(root, wrap="word")
+    view.text.pack()
+    timings = []
+    start = time.perf_counter()
+    for i, text in enumerate(messages(count, random.Random(1)), 1):
+        view.append(text)
+        if i % PER_TICK == 0:
+            root.update()
+        if i % (count // SLICES) == 0:
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+    stats = view.stats()
+    view.text.destroy()
+    return timings, stats
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise SystemExit(f"No display ({e}); run under xvfb-run")
+    root.geometry("900x600")
+
+    plain = run_plain(root, count)
+    view, stats = run_view(root, count)
+    root.destroy()
+
+    per_slice = count // SLICES
+    print(f"{'messages':>10} {'plain us/msg':>14} {'ChatView us/msg':>16}")
+    for n, (a, b) in enumerate(zip(plain, view), 1):
+        print(f"{n * per_slice:>10,} {a / per_slice * 1e6:>14.1f} {b / per_slice * 1e6:>16.1f}")
+    print(f"ChatView at the end: {stats}")
+
+if __name__ == "__main__":
+    main()
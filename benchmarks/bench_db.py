@@ -0,0 +1,68 @@
+"""10k simulated logins: a new sqlite3 connection per login vs the pooled manager.
+
+Run: python benchmarks/bench_db.py [logins]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import ConnectionManager
+
+USERS = 10_000
+LOGIN_SQL = "SELECT * FROM register WHERE email=? AND password=?"
+
+def seed(db, users):
+    with db.transaction():
+        db.executemany("INSERT INTO register (fname,lname,email,password,securityQ,securityA) VALUES (?,?,?,?,?,?)",
+                       ((f"First{i}", f"Last{i}", f"user{i}@example.com", f"pw{i}", "Your Pet Name", "rex")
+                        for i in range(users)))
+
+def connect_per_call(db_name, attempts):
+    """What LoginWindow.login used to do"""
+    for email, password in attempts:
+        conn = sqlite3.connect(db_name)
+        try:
+            conn.cursor().execute(LOGIN_SQL, (email, password)).fetchone()
+        finally:
+            conn.close()
+
+def pooled(db, attempts):
+    for email, password in attempts:
+        db.execute(LOGIN_SQL, (email, password)).fetchone()
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(1)
+    attempts = [(f"user{i}@example.com", f"pw{i}" if rng.random() < 0.9 else "wrong")
+                for i in (rng.randrange(USERS) for _ in range(logins))]
+    workdir = tempfile.mkdtemp(prefix="dbbench")
+    try:
+        db_name = os.path.join(workdir, "chatbot.db")
+        db = ConnectionManager(db_name)
+        seed(db, USERS)
+
+        start = time.perf_counter()
+        connect_per_call(db_name, attempts)
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pooled(db, attempts)
+        shared = time.perf_counter() - start
+
+        print(f"{logins} logins against {USERS} users")
+        print(f"  connect per call: {naive:.2f} s  ({logins / naive:,.0f} logins/s)")
+        print(f"  pooled:           {shared:.2f} s  ({logins / shared:,.0f} logins/s)  {naive / shared:.1f}x")
+        for entry in db.query_stats():
+            print(f"  {entry['count']:>6} x {entry['mean_ms']:.3f} ms  {entry['sql'][:70]}")
+        db.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare the compiled intent matcher with the old if/elif keyword cascade.
+
+Run: python benchmarks/bench_intents.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import INTENTS, Intent, IntentMatcher
+
+TABLE_SIZES = [len(INTENTS), 100, 300, 1000]
+MESSAGES = 2000
+
+def synthetic_intents(count, rng):
+    """The real table padded with random keyword intents up to ``count``"""
+    intents = list(INTENTS)
+    for i in range(count - len(intents)):
+        keywords = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(4)]
+        intents.append(Intent(f"synthetic{i}", 10, keywords, "ok"))
+    return intents
+
+def synthetic_messages(intents, count, rng):
+    words = ["please", "could", "you", "tell", "me", "about", "the", "thing", "we", "discussed", "yesterday"]
+    messages = []
+    for _ in range(count):
+        message = rng.choices(words, k=rng.randint(5, 15))
+        if rng.random() < 0.7:
+            message.insert(rng.randrange(len(message)), rng.choice(rng.choice(intents).keywords))
+        messages.append(" ".join(message))
+    return messages
+
+def cascade_match(intents, user_input):
+    """The original approach: one substring scan per keyword, first intent wins"""
+    user_input_lower = user_input.lower()
+    for intent in intents:
+        if any(word in user_input_lower for word in intent.keywords):
+            return intent
+    return None
+
+def rate(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return len(messages) / (time.perf_counter() - start)
+
+def main():
+    rng = random.Random(42)
+    print(f"{'intents':>8} {'cascade msg/s':>15} {'compiled msg/s':>15} {'speedup':>8}")
+    for size in TABLE_SIZES:
+        intents = synthetic_intents(size, rng)
+        messages = synthetic_messages(intents, MESSAGES, rng)
+        matcher = IntentMatcher(intents)
+        cascade = rate(lambda m: cascade_match(intents, m), messages)
+        compiled = rate(matcher.match, messages)
+        print(f"{size:>8} {cascade:>15,.0f} {compiled:>15,.0f} {compiled / cascade:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
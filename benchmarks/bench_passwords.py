@@ -0,0 +1,51 @@
+"""Logins/sec per core at each password-hashing cost level.
+
+Run: python benchmarks/bench_passwords.py [seconds per level]
+One verify is one login's hashing cost; verifies run back to back on a single
+thread, so the rate is per core. Also prints what calibrate() picks here.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords
+from passwords import ScryptHasher, PBKDF2Hasher
+
+LEVELS = [
+    ("legacy sha256", None),
+    *[(f"scrypt n=2^{k} r=8 p=1", ScryptHasher(n=2 ** k)) for k in (12, 13, 14, 15, 16, 17)],
+    *[(f"pbkdf2_sha256 {i:,} iters", PBKDF2Hasher(i)) for i in (100_000, 310_000, 600_000, 1_200_000)],
+]
+
+def legacy_hash(password):
+    import hashlib
+    return f"salt${hashlib.sha256((password + 'salt').encode()).hexdigest()}"
+
+def logins_per_sec(encoded, seconds):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        passwords.verify("correct horse battery staple", encoded)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and count >= 3:
+            return count / elapsed, elapsed / count
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    print(f"{'cost level':<30} {'ms/verify':>10} {'logins/s/core':>14}")
+    for name, hasher in LEVELS:
+        encoded = hasher.hash("correct horse battery staple") if hasher else legacy_hash("correct horse battery staple")
+        rate, per_call = logins_per_sec(encoded, seconds)
+        print(f"{name:<30} {per_call * 1000:>10.2f} {rate:>14.1f}")
+
+    for algorithm in ("scrypt", "pbkdf2_sha256"):
+        start = time.perf_counter()
+        hasher = passwords.calibrate(algorithm, target=0.1)
+        print(f"calibrate({algorithm}, 100 ms) -> {hasher.params()} "
+              f"in {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    main()
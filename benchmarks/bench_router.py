@@ -0,0 +1,120 @@
+"""Tail latency against a faulty upstream: plain OpenAI calls vs the backend router.
+
+Run: python benchmarks/bench_router.py --requests 200 --error-rate 0.1 --hang-rate 0.03 --budget 2
+Starts stub_openai.py with fault injection, then answers the same unique
+prompts twice: once calling OpenAI directly with canned-answer fallback on
+error (the old behaviour), once through engine.get_chatbot_response and its
+router. Prints latency percentiles, how often the local answer was used and
+the router's breaker state and histograms.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november "
+         "oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_up(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("stub did not come up")
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else float("nan")
+
+def run(label, answer, prompts, concurrency):
+    def timed(prompt):
+        start = time.perf_counter()
+        source = answer(prompt)
+        return time.perf_counter() - start, source
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, prompts))
+    elapsed = time.perf_counter() - start
+    latencies = [latency * 1000 for latency, source in results]
+    local = sum(source == "local" for latency, source in results)
+    print(f"{label:<8} p50 {percentile(latencies, 50):8.0f} ms  p99 {percentile(latencies, 99):8.0f} ms  "
+          f"max {max(latencies):8.0f} ms  local answers {local:4d}/{len(results)}  wall {elapsed:6.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--budget", type=float, default=2.0, help="router budget in seconds")
+    parser.add_argument("--latency", type=float, default=150, help="stub latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--hang-rate", type=float, default=0.03)
+    parser.add_argument("--hang", type=float, default=15, help="seconds a stalled upstream request waits")
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=4000, help="ms")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="routerbench")
+    port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(ROOT, "stub_openai.py"), "--port", str(port),
+                             "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+                             "--hang-rate", str(args.hang_rate), "--hang", str(args.hang),
+                             "--slow-rate", str(args.slow_rate), "--slow-latency", str(args.slow_latency),
+                             "--seed", "1"], stdout=subprocess.DEVNULL)
+    os.environ.update(OPENAI_API_KEY="stub", OPENAI_API_BASE=f"http://127.0.0.1:{port}/v1",
+                      OPENAI_BUDGET_S=str(args.budget))
+    os.chdir(workdir)
+    try:
+        import engine
+        import openai
+        wait_until_up(port)
+        engine.setup_database()
+        rng = random.Random(5)
+
+        def prompts():
+            return [" ".join(rng.choices(WORDS, k=10)) for _ in range(args.requests)]
+
+        def direct(prompt):
+            """The old path: one call with the library's timeout, canned answer on any error"""
+            try:
+                openai.ChatCompletion.create(messages=[{"role": "user", "content": prompt}], **engine.OPENAI_PARAMS)
+                return "remote"
+            except Exception:
+                engine.get_fallback_response(prompt)
+                return "local"
+
+        def routed(prompt):
+            # Stub replies are "stub0 stub1 ..."; anything else came from the intents
+            return "remote" if engine.get_chatbot_response(prompt).startswith("stub") else "local"
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, budget {args.budget:.1f} s; "
+              f"faults: {args.error_rate:.0%} errors, {args.hang_rate:.0%} hangs, {args.slow_rate:.0%} slow")
+        run("direct", direct, prompts(), args.concurrency)
+        run("router", routed, prompts(), args.concurrency)
+        print(json.dumps(engine.router.get_stats(), indent=2))
+    finally:
+        stub.terminate()
+        stub.wait()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+        os._exit(0)  # don't wait for upstream calls abandoned at their deadline
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Offline load test: stub OpenAI + chat service, open-loop at a target request rate.
+
+Run: python benchmarks/bench_service.py --rate 50 --duration 20 --workers 2
+Reports p50/p99 latency (time to full reply, and time to first event when
+--stream is given) for POST /chat.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november "
+         "oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_until_up(session, url, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else float("nan")
+
+async def one_chat(session, base, token, prompt, stream, results):
+    start = time.perf_counter()
+    first = None
+    try:
+        async with session.post(f"{base}/chat", json={"message": prompt, "stream": stream},
+                                headers={"Authorization": f"Bearer {token}"}) as response:
+            if stream:
+                async for _ in response.content.iter_any():
+                    first = first or time.perf_counter()
+            else:
+                await response.read()
+            results.append((response.status, time.perf_counter() - start, (first or start) - start))
+    except aiohttp.ClientError:
+        results.append((0, time.perf_counter() - start, 0.0))
+
+async def run_load(args, base):
+    rng = random.Random(3)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_until_up(session, f"{base}/health")
+        tokens = []
+        for i in range(args.users):
+            user = {"fname": "Load", "lname": f"User{i}", "email": f"load{i}@example.com", "password": "pw",
+                    "securityQ": "Your Pet Name", "securityA": "rex"}
+            async with session.post(f"{base}/register", json=user) as response:
+                await response.read()
+            async with session.post(f"{base}/login", json={"email": user["email"], "password": "pw"}) as response:
+                tokens.append((await response.json())["token"])
+
+        results, tasks = [], []
+        start = time.perf_counter()
+        total = int(args.rate * args.duration)
+        for n in range(total):
+            # Open loop: requests go out on schedule whether or not earlier ones finished
+            delay = start + n / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            prompt = " ".join(rng.choices(WORDS, k=12))
+            tasks.append(asyncio.create_task(one_chat(session, base, tokens[n % len(tokens)], prompt,
+                                                      args.stream, results)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[0] == 200]
+    print(f"target {args.rate:.0f} req/s for {args.duration:.0f} s -> {len(results) / elapsed:.1f} req/s achieved")
+    print(f"  ok: {len(ok)}  429: {sum(r[0] == 429 for r in results)}  "
+          f"errors: {sum(r[0] not in (200, 429) for r in results)}")
+    latencies = [r[1] * 1000 for r in ok]
+    print(f"  latency     p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms")
+    if args.stream:
+        firsts = [r[2] * 1000 for r in ok]
+        print(f"  first byte  p50 {percentile(firsts, 50):7.1f} ms   p99 {percentile(firsts, 99):7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=50, help="requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--stub-latency", type=float, default=200, help="ms")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="servicebench")
+    stub_port, service_port = free_port(), free_port()
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_API_BASE=f"http://127.0.0.1:{stub_port}/v1")
+    procs = [
+        subprocess.Popen([sys.executable, os.path.join(ROOT, "stub_openai.py"), "--port", str(stub_port),
+                          "--latency", str(args.stub_latency)], cwd=workdir, env=env, stdout=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, os.path.join(ROOT, "service.py"), "--port", str(service_port),
+                          "--workers", str(args.workers), "--per-user-limit", "8"],
+                         cwd=workdir, env=env, stdout=subprocess.DEVNULL),
+    ]
+    try:
+        asyncio.run(run_load(args, f"http://127.0.0.1:{service_port}"))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
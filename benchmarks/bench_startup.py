@@ -0,0 +1,102 @@
+"""Startup cost: lazy imports and the cached background image vs the old eager path.
+
+Run: python benchmarks/bench_startup.py [runs]
+Imports chatbot in fresh interpreters under ``python -X importtime`` and
+compares it with an eager proxy that also imports openai, numpy and PIL up
+front (what the old chatbot.py pulled in). Lists which heavy modules the
+plain import still loads, times the scaled background image cold (resize
+with PIL) and warm (cached PPM), and, when a display is available, the time
+from interpreter start to the first drawn login window.
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+HEAVY = ("openai", "numpy", "PIL", "aiohttp", "tiktoken", "vectorstore", "asyncio", "cProfile")
+EAGER = "import openai, numpy, PIL.Image, PIL.ImageTk, chatbot"
+FIRST_WINDOW = """
+import time, tkinter as tk
+import chatbot
+root = tk.Tk()
+chatbot.LoginWindow(root)
+root.update()
+print(time.perf_counter())
+root.destroy()
+"""
+
+def run_python(args, env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+def import_time(code, env):
+    """Cumulative microseconds of the top-level imports in ``code``, from -X importtime"""
+    result = run_python(["-X", "importtime", "-c", code], env)
+    if result.returncode:
+        raise SystemExit(result.stderr.strip().splitlines()[-1])
+    total = 0
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match and len(match.group(2)) == 1:  # top level only; nested times are included
+            total += int(match.group(1))
+    return total
+
+def loaded_heavy(env):
+    code = f"import sys, chatbot; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    return run_python(["-c", code], env).stdout.split()
+
+def first_window(env):
+    """Seconds from spawning the interpreter to the login window being drawn, or None without a display"""
+    start = time.perf_counter()
+    result = run_python(["-c", FIRST_WINDOW], env)
+    end = time.perf_counter()
+    if result.returncode:
+        return None
+    # perf_counter is system-wide on Linux, so the child's stamp is comparable with ours
+    drawn = float(result.stdout.split()[-1])
+    return (drawn if start < drawn < end else end) - start
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    cache_home = tempfile.mkdtemp(prefix="startupbench")
+    env = dict(os.environ, XDG_CACHE_HOME=cache_home, OPENAI_API_KEY="")
+    try:
+        base = median([import_time("pass", env) for _ in range(runs)])  # site, encodings, ...
+        lazy = (median([import_time("import chatbot", env) for _ in range(runs)]) - base) / 1000
+        eager = (median([import_time(EAGER, env) for _ in range(runs)]) - base) / 1000
+        print(f"import chatbot              {lazy:7.1f} ms")
+        print(f"eager openai/numpy/PIL      {eager:7.1f} ms (what the old import paid)")
+        print(f"heavy modules loaded by 'import chatbot': {', '.join(loaded_heavy(env)) or 'none'}")
+
+        os.environ["XDG_CACHE_HOME"] = cache_home
+        import chatbot
+        start = time.perf_counter()
+        chatbot.scaled_image_path(chatbot.BACKGROUND_IMAGE, (1550, 800))
+        cold = time.perf_counter() - start
+        warm = median([timed(chatbot.scaled_image_path, chatbot.BACKGROUND_IMAGE, (1550, 800)) for _ in range(runs)])
+        print(f"background image cold       {cold * 1000:7.1f} ms (PIL resize, writes the PPM)")
+        print(f"background image warm       {warm * 1000:7.1f} ms (cached PPM)")
+
+        windows = [first_window(env) for _ in range(runs)]
+        if None in windows:
+            print("time to first window        skipped (no display; try xvfb-run)")
+        else:
+            print(f"time to first window        {median(windows) * 1000:7.1f} ms (warm image cache)")
+    finally:
+        shutil.rmtree(cache_home, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
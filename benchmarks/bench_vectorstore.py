@@ -0,0 +1,69 @@
+"""Query latency of the vector store, exact vs IVF, at growing sizes.
+
+Run: python benchmarks/bench_vectorstore.py [sizes...]   (default: 10000 100000 1000000)
+The 1M run writes a ~1 GB memory-mapped file to a temporary directory.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vectorstore import HashingEmbedder, VectorStore
+
+DIM = 256
+QUERIES = 64
+K = 10
+
+def clustered_vectors(count, rng, clusters=1000):
+    """Unit vectors scattered around random topic centers, like real embeddings"""
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    for lo in range(0, count, 100_000):
+        hi = min(lo + 100_000, count)
+        block = centers[rng.integers(0, clusters, hi - lo)] + 0.6 * rng.standard_normal((hi - lo, DIM)).astype(np.float32)
+        yield block / np.linalg.norm(block, axis=1, keepdims=True)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rng = np.random.default_rng(7)
+    workdir = tempfile.mkdtemp(prefix="vectorbench")
+    try:
+        print(f"{'vectors':>9} {'exact ms/q':>11} {'ivf ms/q':>9} {'ivf build s':>12} {'recall@10':>10}")
+        for size in sizes:
+            store = VectorStore(os.path.join(workdir, f"v{size}"), HashingEmbedder(dim=DIM),
+                                ivf_threshold=size + 1, nprobe=16)
+            vectors = None
+            for block in clustered_vectors(size, rng):
+                store.add_vectors(block, [""] * len(block))
+                vectors = block
+            queries = vectors[:QUERIES] + 0.3 * rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            store.search_exact(queries[:1], K, 0, size)  # warm the page cache
+            exact, exact_time = timed(store.search_exact, queries, K, 0, size)
+            _, build_time = timed(store.build_ivf)
+            ivf, ivf_time = timed(lambda: [store.search_ivf(q, K, size) for q in queries])
+
+            recall = np.mean([len({r for r, _ in a} & {r for r, _ in b}) / K for a, b in zip(exact, ivf)])
+            print(f"{size:>9} {exact_time / QUERIES * 1000:>11.2f} {ivf_time / QUERIES * 1000:>9.2f} "
+                  f"{build_time:>12.1f} {recall:>10.2f}")
+            store.close()
+
+        embedder = HashingEmbedder(dim=DIM)
+        texts = ["How do I reset my password if I forgot the security answer?"] * 1000
+        _, embed_time = timed(embedder.embed, texts)
+        print(f"\nembedding: {embed_time / len(texts) * 1e6:.0f} us per prompt")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
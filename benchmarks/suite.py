@@ -0,0 +1,327 @@
+"""Reproducible benchmark suite for the engine, storage and UI paths.
+
+Run: python benchmarks/suite.py [--quick] [--only engine,auth] [--compare benchmarks/results/baseline.json]
+
+Suites:
+  engine     get_chatbot_response for every intent on the local path, and
+             with a mocked OpenAI client (cache miss and cache hit)
+  passwords  hash_password / verify_password at the calibrated work factor
+  auth       register / login / reset against a chatbot.db holding 1k, 100k
+             and 1M users (--sizes)
+  ui         append and streaming throughput of a ChatbotWindow; needs a
+             display, so use xvfb-run on a headless machine (skipped otherwise)
+
+Users and prompts are generated from fixed seeds, so every run sees the same
+data. Auth runs hash with a single PBKDF2 iteration so they measure storage
+rather than the KDF (the passwords suite covers that), and the seeded users
+share one password hash because hashing a million passwords would dominate
+the run. Everything runs in a temporary directory.
+
+Results are written as JSON (--output, benchmarks/results/latest.json by
+default). With --compare, each benchmark's median is checked against the
+baseline file and the run exits with status 1 when any is slower by more
+than --threshold (25% by default). Compare runs made on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DATASET_VERSION = 1  # bump when the generators below change, so old baselines are not compared blindly
+SEED = 20240101
+PASSWORD = "correct horse battery staple"
+FIRST_NAMES = "Ada Alan Barbara Claude Donald Edsger Frances Grace Ken Linus Margaret Niklaus Radia Tim".split()
+LAST_NAMES = "Lovelace Turing Liskov Shannon Knuth Dijkstra Allen Hopper Thompson Torvalds Hamilton Wirth".split()
+ANSWERS = "Paris Lagos Lima Oslo Quito Rome Seoul Tunis Mary Anna Rex Felix Luna Max".split()
+FILLER = "please could you tell me about the thing we discussed yesterday and also".split()
+TOPICS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar "
+          "papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+
+# -------------------- DATASETS --------------------
+def make_user(i):
+    """The i-th synthetic user; the same index always gives the same user"""
+    rng = random.Random(SEED * 1_000_003 + i)
+    return (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{i:07d}@example.com", PASSWORD,
+            ("Your Birth Place", "Your Mother Name", "Your Pet Name")[i % 3], rng.choice(ANSWERS))
+
+def make_intent_prompts(count):
+    """{intent name: prompts}, each prompt one of the intent's keywords in filler text"""
+    from intents import INTENTS
+    rng = random.Random(SEED)
+    prompts = {}
+    for intent in INTENTS:
+        prompts[intent.name] = []
+        for _ in range(count):
+            words = rng.choices(FILLER, k=rng.randint(3, 12))
+            words.insert(rng.randrange(len(words) + 1), rng.choice(intent.keywords))
+            prompts[intent.name].append(" ".join(words))
+    prompts["arithmetic"] = [f"what is {rng.randint(1, 999)} {rng.choice('+-*/')} {rng.randint(1, 99)} "
+                             f"{rng.choice('+-*')} {rng.randint(1, 9)}" for _ in range(count)]
+    prompts["no_match"] = [" ".join(rng.choices(TOPICS, k=rng.randint(4, 12))) for _ in range(count)]
+    return prompts
+
+def make_open_prompts(count):
+    """Distinct free-form questions, so each one misses the response cache"""
+    rng = random.Random(SEED + 1)
+    return [f"question {i}: " + " ".join(rng.choices(TOPICS, k=rng.randint(6, 16))) for i in range(count)]
+
+def make_messages(count):
+    rng = random.Random(SEED + 2)
+    for i in range(count):
+        text = " ".join(rng.choices(TOPICS + FILLER, k=rng.randint(5, 60)))
+        yield f"👤 You: {text}\n" if i % 2 == 0 else f"🤖 Bot: {text}\n\n"
+
+# -------------------- MEASUREMENT --------------------
+def measure(func, items, warmup=0):
+    """Call func(item) for each item and summarize the per-call times"""
+    for item in items[:warmup]:
+        func(item)
+    clock = time.perf_counter
+    timings = []
+    for item in items:
+        start = clock()
+        func(item)
+        timings.append(clock() - start)
+    return summarize(timings)
+
+def summarize(timings):
+    timings = sorted(timings)
+    total = sum(timings)
+    def us(value):
+        return round(value * 1_000_000, 2)
+    return {"ops": len(timings), "p50_us": us(timings[len(timings) // 2]),
+            "p95_us": us(timings[min(len(timings) - 1, int(len(timings) * 0.95))]),
+            "mean_us": us(total / len(timings)), "ops_per_s": round(len(timings) / total, 1) if total else None}
+
+# -------------------- ENGINE --------------------
+class FakeOpenAI:
+    """Stands in for the openai module: every completion comes back at once"""
+
+    class ChatCompletion:
+        @staticmethod
+        def create(messages, **params):
+            content = f"Echo: {messages[-1]['content']}"
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+@contextmanager
+def mocked_openai(engine):
+    saved = engine.OPENAI_API_KEY, engine.get_openai
+    engine.OPENAI_API_KEY, engine.get_openai = "benchmark", lambda: FakeOpenAI
+    try:
+        yield
+    finally:
+        engine.OPENAI_API_KEY, engine.get_openai = saved
+
+def bench_engine(args):
+    import engine
+    count = 300 if args.quick else 2000
+    for name, prompts in make_intent_prompts(count).items():
+        yield f"engine.intent.{name}", measure(engine.get_chatbot_response, prompts, warmup=20)
+    prompts = make_open_prompts(count // 4)
+    with mocked_openai(engine):
+        yield "engine.openai.miss", measure(engine.get_chatbot_response, prompts, warmup=5)
+        yield "engine.openai.hit", measure(engine.get_chatbot_response, prompts)
+
+# -------------------- PASSWORDS --------------------
+def bench_passwords(args):
+    import engine
+    count = 5 if args.quick else 20
+    hasher = engine.password_policy.current()  # waits for calibration
+    print(f"  calibrated: {hasher.algorithm} {hasher.params()}")
+    encoded = engine.hash_password(PASSWORD)
+    yield "passwords.hash", measure(engine.hash_password, [PASSWORD] * count, warmup=1)
+    yield "passwords.verify", measure(lambda password: engine.verify_password(password, encoded),
+                                      [PASSWORD] * count, warmup=1)
+
+# -------------------- AUTH --------------------
+def fixed_policy(hasher):
+    """A PasswordPolicy that skips calibration and always uses ``hasher``"""
+    from passwords import PasswordPolicy
+    policy = PasswordPolicy(hasher.algorithm)
+    policy.hasher = hasher
+    policy.started = True
+    policy.ready.set()
+    return policy
+
+def seed_users(db, size):
+    """Bulk-load ``size`` synthetic users sharing one password hash"""
+    import engine
+    encoded = engine.hash_password(PASSWORD)
+    rows = ((*user[:3], encoded, *user[4:]) for user in map(make_user, range(size)))
+    with db.transaction():
+        db.executemany("INSERT INTO register (fname,lname,email,password,securityQ,securityA) "
+                       "VALUES (?,?,?,?,?,?)", rows)
+
+@contextmanager
+def user_database(size):
+    import engine
+    from db import ConnectionManager
+    from passwords import PBKDF2Hasher
+    saved = engine.db, engine.password_policy
+    engine.db = ConnectionManager(f"users-{size}.db")
+    engine.password_policy = fixed_policy(PBKDF2Hasher(1))
+    try:
+        start = time.perf_counter()
+        seed_users(engine.db, size)
+        print(f"  seeded {size:,} users in {time.perf_counter() - start:.1f} s")
+        yield engine.db
+    finally:
+        engine.db.close_all()
+        engine.db, engine.password_policy = saved
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(f"users-{size}.db{suffix}"):
+                os.remove(f"users-{size}.db{suffix}")
+
+def bench_auth(args):
+    import engine
+    count = 200 if args.quick else 2000
+    for size in args.sizes:
+        with user_database(size):
+            rng = random.Random(SEED + size)
+            existing = [make_user(i) for i in rng.sample(range(size), min(count, size))]
+            label = f"{size // 1_000_000}m" if size >= 1_000_000 else f"{size // 1000}k" if size >= 1000 else str(size)
+            yield f"auth.register.{label}", measure(lambda user: engine.register_user(*user),
+                                                    [make_user(size + i) for i in range(count)])
+            yield f"auth.login.{label}", measure(lambda user: engine.authenticate(user[2], user[3]), existing)
+            yield f"auth.login_unknown.{label}", measure(lambda user: engine.authenticate(f"x{user[2]}", user[3]),
+                                                         existing)
+            yield f"auth.reset.{label}", measure(lambda user: engine.reset_password(user[2], user[4], user[5], user[3]),
+                                                 existing)
+
+# -------------------- UI --------------------
+def bench_ui(args):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"  skipped: no display ({e}); run under xvfb-run")
+        return
+    from chatbot import ChatbotWindow
+    root.withdraw()
+    window = ChatbotWindow(root)
+    try:
+        messages = list(make_messages(2000 if args.quick else 20000))
+        pairs = [messages[i:i + 2] for i in range(0, len(messages), 2)]
+
+        def append(pair):
+            """One question and its answer, drawn in the same tick"""
+            for text in pair:
+                window.append_text(text)
+            window.update()
+
+        yield "ui.append", measure(append, pairs, warmup=50)
+
+        renderer = window.renderer
+        def stream(request_id):
+            """One reply streamed as 40 deltas over 4 frames"""
+            for frame in range(4):
+                for token in range(10):
+                    renderer.feed(request_id, f"tok{token} ")
+                renderer.flush()
+                window.update()
+            renderer.finish(request_id)
+
+        yield "ui.stream", measure(stream, list(range(1, (100 if args.quick else 500) + 1)), warmup=5)
+    finally:
+        window.destroy()
+        root.destroy()
+
+SUITES = {"engine": bench_engine, "passwords": bench_passwords, "auth": bench_auth, "ui": bench_ui}
+
+# -------------------- BASELINES --------------------
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "dataset_version": DATASET_VERSION, "seed": SEED, "quick": args.quick, "sizes": args.sizes}
+
+def compare(results, baseline, threshold):
+    """Print the change in median per benchmark; returns the names that regressed"""
+    if baseline["meta"].get("dataset_version") != DATASET_VERSION or baseline["meta"].get("seed") != SEED:
+        print("warning: baseline was made from different datasets")
+    if baseline["meta"].get("quick") != results["meta"]["quick"]:
+        print("warning: comparing a --quick run with a full one")
+    regressions = []
+    print(f"\n{'benchmark':<34} {'baseline p50':>13} {'p50':>11} {'change':>8}")
+    for name, result in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<34} {'-':>13} {result['p50_us']:>9.1f}us {'new':>8}")
+            continue
+        change = result["p50_us"] / old["p50_us"] - 1 if old["p50_us"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<34} {old['p50_us']:>11.1f}us {result['p50_us']:>9.1f}us {change:>+8.0%}{flag}")
+    return regressions
+
+# -------------------- MAIN --------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--only", default=",".join(SUITES), help="comma-separated suites to run")
+    parser.add_argument("--quick", action="store_true", help="fewer operations and smaller user tables")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=None,
+                        help="user table sizes for the auth suite (default 1000,100000,1000000)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of the median")
+    args = parser.parse_args()
+    if args.sizes is None:
+        args.sizes = [1000, 10_000] if args.quick else [1000, 100_000, 1_000_000]
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    random.seed(SEED)  # canned jokes and generic replies are picked at random
+    os.environ["OPENAI_API_KEY"] = ""  # the local path unless a suite mocks the client
+    os.environ.pop("CHATBOT_TRACE", None)
+    workdir = tempfile.mkdtemp(prefix="chatbotbench")
+    os.chdir(workdir)  # chatbot.db and the vector stores are relative paths
+    results = {"meta": metadata(args), "results": {}}
+    try:
+        import engine
+        engine.setup_database()
+        engine.password_policy.current()  # let calibration finish so it does not skew the first suite
+        for suite in args.only.split(","):
+            print(f"[{suite}]")
+            for name, result in SUITES[suite](args):
+                results["results"][name] = result
+                print(f"  {name:<32} p50 {result['p50_us']:>11.1f} us  p95 {result['p95_us']:>11.1f} us  "
+                      f"{result['ops_per_s'] or 0:>10,.0f} ops/s")
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------- RESPONSE CACHE --------------------
+class Flight:
+    """One upstream call that concurrent identical requests share"""
+
+    def __init__(self, key):
+        self.key = key
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+        self.start = time.perf_counter()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def add_done_callback(self, callback):
+        """Call ``callback()`` when the flight completes, from the completing thread (now if it has)"""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def finish(self, response, error):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.response, self.error = response, error
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def wait(self):
+        """Block until the leader completes; returns its response or raises its error"""
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+class ResponseCache:
+    """Two-tier cache for upstream responses.
+
+    An in-memory LRU sits in front of a SQLite table that survives restarts.
+    Entries expire after ``ttl`` seconds. Identical prompts requested at the same
+    time share a single upstream call (single-flight). The lock only guards
+    the in-memory state; SQLite reads and writes run outside it, and disk hits
+    record ``last_used`` in batches rather than a commit per read.
+    """
+
+    def __init__(self, db, max_memory=512, max_rows=20000, ttl=24 * 3600):
+        self.db = db
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.memory = OrderedDict()  # key -> (response, created_at, latency)
+        self.lock = threading.Lock()
+        self.inflight = {}           # key -> Flight
+        self.puts_since_trim = 0
+        self.touched = {}            # key -> last_used not yet written
+        self.touch_batch = 100
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+            "expired": 0, "evicted": 0, "latency_saved": 0.0,
+        }
+
+    @staticmethod
+    def normalize(prompt):
+        return " ".join(prompt.lower().split()).rstrip("?!. ")
+
+    def make_key(self, prompt, params):
+        raw = json.dumps([self.normalize(prompt), params], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached response or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    self.stats["latency_saved"] += entry[2]
+                    return entry[0]
+                del self.memory[key]
+                self.stats["expired"] += 1
+        # SQLite I/O happens outside the lock; the connection is this thread's own
+        try:
+            row = self.db.execute("SELECT response, created_at, latency FROM response_cache WHERE key=?",
+                                  (key,)).fetchone()
+            if row is not None and now - row[1] >= self.ttl:
+                with self.db.transaction():
+                    self.db.execute("DELETE FROM response_cache WHERE key=?", (key,))
+                with self.lock:
+                    self.stats["expired"] += 1
+                row = None
+        except sqlite3.Error as err:
+            print(f"Cache Error: {err}")
+            row = None
+        with self.lock:
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.remember(key, row)
+            self.stats["disk_hits"] += 1
+            self.stats["latency_saved"] += row[2]
+            # last_used is only for trimming, so hits are written in batches, not one commit each
+            self.touched[key] = now
+            touched = self.take_touched() if len(self.touched) >= self.touch_batch else None
+        if touched:
+            try:
+                with self.db.transaction():
+                    self.write_touched(touched)
+            except sqlite3.Error as err:
+                print(f"Cache Error: {err}")
+        return row[0]
+
+    def put(self, key, response, latency=0.0):
+        now = time.time()
+        with self.lock:
+            self.remember(key, (response, now, latency))
+            self.puts_since_trim += 1
+            trim = self.puts_since_trim >= 100
+            if trim:
+                self.puts_since_trim = 0
+            touched = self.take_touched()
+        try:
+            with self.db.transaction():
+                self.db.execute("INSERT OR REPLACE INTO response_cache (key, response, created_at, last_used, latency) "
+                                "VALUES (?,?,?,?,?)", (key, response, now, now, latency))
+                self.write_touched(touched)
+                if trim:
+                    self.trim(now)
+        except sqlite3.Error as err:
+            print(f"Cache Error: {err}")
+
+    def remember(self, key, entry):
+        # Called with self.lock held
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def take_touched(self):
+        # Called with self.lock held
+        touched, self.touched = self.touched, {}
+        return touched
+
+    def write_touched(self, touched):
+        if touched:
+            self.db.executemany("UPDATE response_cache SET last_used=? WHERE key=?",
+                                [(used, key) for key, used in touched.items()])
+
+    def trim(self, now):
+        """Drop expired rows, then the least recently used ones above max_rows"""
+        expired = self.db.execute("DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        (count,) = self.db.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        evicted = max(0, count - self.max_rows)
+        if evicted:
+            self.db.execute("DELETE FROM response_cache WHERE key IN "
+                            "(SELECT key FROM response_cache ORDER BY last_used LIMIT ?)", (evicted,))
+        with self.lock:
+            self.stats["expired"] += expired
+            self.stats["evicted"] += evicted
+
+    def join(self, key):
+        """Look up ``key`` and, on a miss, join the upstream call for it.
+
+        Returns (response, flight, leader). On a hit flight is None. Otherwise
+        the first caller is the leader and must end the flight with complete();
+        callers arriving meanwhile get the same flight and can wait() on it.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response, None, False
+        with self.lock:
+            if key in self.memory:  # filled by a flight that finished since the lookup
+                return self.memory[key][0], None, False
+            flight = self.inflight.get(key)
+            if flight is None:
+                flight = self.inflight[key] = Flight(key)
+                return None, flight, True
+            self.stats["coalesced"] += 1
+            return None, flight, False
+
+    def complete(self, flight, response=None, error=None):
+        """End a flight: cache the response (unless there was an error) and wake the waiters"""
+        if flight.event.is_set():
+            return
+        if error is None:
+            self.put(flight.key, response, time.perf_counter() - flight.start)
+        with self.lock:
+            self.inflight.pop(flight.key, None)
+        flight.finish(response, error)
+
+    def get_or_compute(self, prompt, params, compute):
+        """Return a cached response, or call ``compute()`` once for all concurrent callers"""
+        response, flight, leader = self.join(self.make_key(prompt, params))
+        if flight is None:
+            return response
+        if not leader:
+            return flight.wait()
+        try:
+            response = compute()
+        except BaseException as e:
+            self.complete(flight, error=e)
+            raise
+        self.complete(flight, response)
+        return response
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        stats["hit_rate"] = hits / (hits + stats["misses"]) if hits + stats["misses"] else 0.0
+        stats["upstream_calls"] = stats["misses"] - stats["coalesced"]
+        return stats
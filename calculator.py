@@ -0,0 +1,252 @@
+"""Safe arithmetic for chat messages, without eval.
+
+Expressions are parsed with ``ast`` and only numbers, + - * / // % ** and
+parentheses are allowed. Exponents and intermediate results are bounded, so
+something like 9**9**9 is refused instead of hanging. Parsed expressions are
+compiled to closures and kept in an LRU cache; evaluate_many() runs a batch
+through NumPy, one vectorized pass per expression shape.
+"""
+import ast
+import math
+import re
+from functools import lru_cache
+
+MAX_LENGTH = 200          # characters in an expression
+MAX_EXPONENT = 1000       # largest |exponent| for **
+MAX_MAGNITUDE = 10 ** 100  # largest |operand| or |result|
+MAX_DIGITS = 100
+
+class CalcError(ValueError):
+    """An expression that is not allowed or cannot be evaluated"""
+
+# -------------------- NATURAL LANGUAGE --------------------
+# One alternation, scanned once; each group maps to an operator symbol
+WORD_OPERATORS = [
+    (r"\bto the power of\b|\braised to(?: the power of)?\b", "**"),
+    (r"\bsquared\b", "**2"),
+    (r"\bcubed\b", "**3"),
+    (r"\bdivided by\b|÷", "/"),
+    (r"\bmultiplied by\b|\btimes\b|×|(?<=\d)\s*x\s*(?=[\d(])", "*"),
+    (r"\bplus\b|\badded to\b", "+"),
+    (r"\bminus\b", "-"),
+    (r"\bmod(?:ulo)?\b", "%"),
+    (r"\^", "**"),
+]
+WORDS = re.compile("|".join(f"({pattern})" for pattern, symbol in WORD_OPERATORS), re.IGNORECASE)
+# Cheap pre-check so most messages skip the substitution pass
+OPERATOR_WORDS = frozenset("to raised squared cubed divided multiplied times plus added minus mod modulo".split())
+OPERATOR_SIGNS = re.compile(r"[÷×^]|\d\s*x")
+WORD = re.compile(r"\w+")
+THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}\b)")
+# A run of numbers, operators and parentheses that starts with an operand
+NUMBER = r"(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+EXPRESSION = re.compile(rf"[-+(]*\s*{NUMBER}(?:[\s()]*(?:\*\*|//|[-+*/%])[\s(+-]*{NUMBER}[\s)]*)+")
+HAS_DIGIT = re.compile(r"\d")
+DATE_LIKE = re.compile(r"\d{1,4}([-/])\d{1,2}\1\d{1,4}")
+# Signs that a message is asking for arithmetic; without one the expression
+# has to be most of the message, so "call me at 555-1234" is left alone
+MATH_CUES = re.compile(r"\b(?:calculate|compute|solve|evaluate|math|what(?:'s| is)|how much is|plus|minus|times"
+                       r"|divided|multiplied|squared|cubed|mod|modulo|raised|power)\b|[÷×^]|\d\s*x\s*\d", re.IGNORECASE)
+MIN_COVERAGE = 0.6
+FILLER = re.compile(r"[\s?!.=]")
+
+def normalize(text):
+    """Turn operator words ("divided by", "times", ...) into symbols"""
+    text = THOUSANDS.sub("", text)
+    if OPERATOR_WORDS.isdisjoint(WORD.findall(text.lower())) and not OPERATOR_SIGNS.search(text):
+        return text
+    return WORDS.sub(lambda match: f" {WORD_OPERATORS[match.lastindex - 1][1]} ", text)
+
+def extract_expression(text):
+    """The longest arithmetic expression in a message, or None if there is none"""
+    if not HAS_DIGIT.search(text):
+        return None
+    candidates = [match.group().strip() for match in EXPRESSION.finditer(normalize(text))]
+    candidates = [expr for expr in candidates if not DATE_LIKE.fullmatch(expr.replace(" ", ""))]
+    if not candidates:
+        return None
+    expression = max(candidates, key=len)
+    # Close parentheses the match cut short, drop ones it never opened
+    depth = 0
+    trimmed = []
+    for char in expression:
+        if char == ")" and depth == 0:
+            continue
+        depth += (char == "(") - (char == ")")
+        trimmed.append(char)
+    return "".join(trimmed) + ")" * depth
+
+# -------------------- COMPILER --------------------
+BINARY = {ast.Add: "add", ast.Sub: "sub", ast.Mult: "mul", ast.Div: "div",
+          ast.FloorDiv: "floordiv", ast.Mod: "mod", ast.Pow: "pow"}
+UNARY = {ast.USub: "neg", ast.UAdd: "pos"}
+SYMBOLS = {"add": "+", "sub": "-", "mul": "*", "div": "/", "floordiv": "//", "mod": "%", "pow": "**",
+           "neg": "-", "pos": "+"}
+
+def build(node, constants):
+    """Compile an AST node to (fn(values, ops), shape); constants are collected in order.
+
+    The shape is the expression with every number replaced by "_", so
+    expressions that differ only in their numbers share it.
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        if not abs(node.value) <= MAX_MAGNITUDE:
+            raise CalcError("number too large")
+        index = len(constants)
+        constants.append(node.value)
+        return (lambda values, ops: values[index]), "_"
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY:
+        name = UNARY[type(node.op)]
+        operand, shape = build(node.operand, constants)
+        return (lambda values, ops: ops[name](operand(values, ops))), f"{SYMBOLS[name]}({shape})"
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+        name = BINARY[type(node.op)]
+        left, left_shape = build(node.left, constants)
+        right, right_shape = build(node.right, constants)
+        return ((lambda values, ops: ops[name](left(values, ops), right(values, ops))),
+                f"({left_shape}{SYMBOLS[name]}{right_shape})")
+    raise CalcError("only numbers and + - * / // % ** are allowed")
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression):
+    """Parse and compile once per distinct expression: returns (fn, shape, constants)"""
+    if len(expression) > MAX_LENGTH:
+        raise CalcError("expression too long")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except (SyntaxError, ValueError, RecursionError):
+        raise CalcError("not a valid expression")
+    constants = []
+    fn, shape = build(tree.body, constants)
+    return fn, shape, tuple(constants)
+
+# -------------------- SCALAR EVALUATION --------------------
+def checked(value):
+    if isinstance(value, complex):
+        raise CalcError("result is not a real number")
+    if not abs(value) <= MAX_MAGNITUDE:
+        raise CalcError("result too large")
+    return value
+
+def divide(op):
+    def apply(a, b):
+        if b == 0:
+            raise CalcError("division by zero")
+        return checked(op(a, b))
+    return apply
+
+def power(a, b):
+    if abs(b) > MAX_EXPONENT:
+        raise CalcError("exponent too large")
+    if a == 0 and b < 0:
+        raise CalcError("division by zero")
+    # Refuse before computing: the digit count of a**b is about b*log10(|a|)
+    if abs(a) > 1 and b * math.log10(abs(a)) > MAX_DIGITS:
+        raise CalcError("result too large")
+    try:
+        return checked(a ** b)
+    except OverflowError:
+        raise CalcError("result too large")
+
+SCALAR_OPS = {
+    "add": lambda a, b: checked(a + b),
+    "sub": lambda a, b: checked(a - b),
+    "mul": lambda a, b: checked(a * b),
+    "div": divide(lambda a, b: a / b),
+    "floordiv": divide(lambda a, b: a // b),
+    "mod": divide(lambda a, b: a % b),
+    "pow": power,
+    "neg": lambda a: -a,
+    "pos": lambda a: a,
+}
+
+def evaluate(expression):
+    """Evaluate an arithmetic expression string; raises CalcError"""
+    fn, shape, constants = compile_expression(expression)
+    try:
+        return fn(constants, SCALAR_OPS)
+    except OverflowError:
+        raise CalcError("result too large")
+
+def format_number(value):
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e16:
+            return str(int(value))
+        return f"{value:.12g}"
+    return str(value)
+
+def asks_for_math(user_input, expression):
+    """Whether ``expression`` is what the message is about, not just numbers in passing"""
+    if MATH_CUES.search(user_input):
+        return True
+    return len(FILLER.sub("", expression)) >= MIN_COVERAGE * len(FILLER.sub("", user_input))
+
+def answer(user_input, strict=False):
+    """Reply for a message containing arithmetic, or None if it has none.
+
+    With ``strict`` the message must also ask for it (see asks_for_math).
+    """
+    expression = extract_expression(user_input)
+    if expression is None or (strict and not asks_for_math(user_input, expression)):
+        return None
+    try:
+        return f"The answer is: {format_number(evaluate(expression))} 🧮"
+    except CalcError as e:
+        return f"I can't calculate that: {e}. 🧮"
+
+# -------------------- BATCH EVALUATION --------------------
+@lru_cache(maxsize=None)
+def vector_ops():
+    import numpy as np
+
+    def bounded(values):
+        return np.where(np.abs(values) <= MAX_MAGNITUDE, values, np.nan)
+
+    def safe_divide(op):
+        return lambda a, b: bounded(op(a, np.where(b == 0, np.nan, b)))
+
+    def vector_power(a, b):
+        allowed = (np.abs(b) <= MAX_EXPONENT) & ~((a == 0) & (b < 0))
+        return bounded(np.where(allowed, np.power(a, np.where(allowed, b, 0.0)), np.nan))
+
+    return {
+        "add": lambda a, b: bounded(a + b),
+        "sub": lambda a, b: bounded(a - b),
+        "mul": lambda a, b: bounded(a * b),
+        "div": safe_divide(np.true_divide),
+        "floordiv": safe_divide(np.floor_divide),
+        "mod": safe_divide(np.mod),
+        "pow": vector_power,
+        "neg": np.negative,
+        "pos": lambda a: a,
+    }
+
+def evaluate_many(expressions):
+    """Evaluate many expressions; returns a float per input, or None where it fails.
+
+    Expressions are grouped by shape and each group is evaluated once over
+    NumPy float64 columns, so results are floats (exact integers only up to
+    2**53) and invalid rows come back as None instead of raising.
+    """
+    import numpy as np
+
+    results = [None] * len(expressions)
+    groups = {}  # shape -> (fn, [indices], [constants])
+    for i, expression in enumerate(expressions):
+        try:
+            fn, shape, constants = compile_expression(expression)
+        except CalcError:
+            continue
+        group = groups.setdefault(shape, (fn, [], []))
+        group[1].append(i)
+        group[2].append(constants)
+
+    ops = vector_ops()
+    with np.errstate(all="ignore"):
+        for fn, indices, rows in groups.values():
+            columns = np.array(rows, dtype=np.float64).T
+            values = np.broadcast_to(fn(columns, ops), (len(indices),))
+            for i, value in zip(indices, values.tolist()):
+                if math.isfinite(value):
+                    results[i] = value
+    return results
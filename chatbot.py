@@ -1,229 +1,399 @@
 import os
+import hashlib
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, END
-from PIL import Image, ImageTk
+from tkinter import ttk, messagebox, END
 import sqlite3
-import openai
-import hashlib
-import secrets
-import numpy as np
-
-# -------------------- CONFIG --------------------
-openai.api_key = os.getenv("OPENAI_API_KEY")  # Use environment variable
-DB_NAME = "chatbot.db"
-
-# -------------------- PASSWORD HASHING --------------------
-def hash_password(password):
-    """Hash a password using SHA-256 with salt"""
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}${password_hash}"
-
-def verify_password(password, stored_hash):
-    """Verify a password against stored hash"""
-    try:
-        salt, stored_password_hash = stored_hash.split('$')
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return password_hash == stored_password_hash
-    except:
-        return False
-
-# -------------------- DATABASE SETUP --------------------
-def setup_database():
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS register (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fname TEXT NOT NULL,
-                lname TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                securityQ TEXT NOT NULL,
-                securityA TEXT NOT NULL
-            )
-        """)
-        
-        conn.commit()
-        print("Database ready!")
-        
-    except sqlite3.Error as err:
-        print(f"Database Error: {err}")
-    finally:
-        if conn:
-            conn.close()
-
-def get_db_connection():
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        return conn
-    except sqlite3.Error as err:
-        messagebox.showerror("Database Error", f"Cannot connect to database: {err}")
-        return None
-
-# -------------------- CHATBOT RESPONSES --------------------
-def get_chatbot_response(user_input):
-    """Get response from OpenAI or fallback to predefined responses"""
-    
-    # First try OpenAI
-    try:
-        if openai.api_key and openai.api_key != "your_openai_api_key_here":
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful and friendly AI assistant. Provide clear, concise, and helpful responses."},
-                    {"role": "user", "content": user_input}
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"OpenAI Error: {e}")
-        # Fall through to predefined responses
-    
-    # Predefined responses for common questions
-    user_input_lower = user_input.lower()
-    
-    # Greetings
-    if any(word in user_input_lower for word in ['hello', 'hi', 'hey', 'hola']):
-        return "Hello! 👋 How can I assist you today?"
-    
-    # How are you
-    elif any(phrase in user_input_lower for phrase in ['how are you', 'how do you do']):
-        return "I'm doing great! Thanks for asking. I'm here and ready to help you with anything you need! 😊"
-    
-    # Name questions
-    elif any(phrase in user_input_lower for phrase in ['what is your name', 'who are you', 'your name']):
-        return "I'm your friendly AI chatbot! I'm here to help answer your questions and chat with you! 🤖"
-    
-    # Capabilities
-    elif any(phrase in user_input_lower for phrase in ['what can you do', 'help', 'capabilities']):
-        return "I can help you with:\n• Answering questions\n• Having conversations\n• Providing information\n• Chatting about various topics\nJust ask me anything! 💡"
-    
-    # Time questions
-    elif any(phrase in user_input_lower for phrase in ['time', 'what time', 'current time']):
-        from datetime import datetime
-        current_time = datetime.now().strftime("%I:%M %p")
-        return f"The current time is {current_time} ⏰"
-    
-    # Date questions
-    elif any(phrase in user_input_lower for phrase in ['date', 'today', 'what date']):
-        from datetime import datetime
-        current_date = datetime.now().strftime("%B %d, %Y")
-        return f"Today is {current_date} 📅"
-    
-    # Weather
-    elif any(phrase in user_input_lower for phrase in ['weather', 'temperature', 'forecast']):
-        return "I'd love to give you weather information, but I need access to current weather data. You might want to check a weather app or website for accurate forecasts! ☀️🌧️"
-    
-    # Math questions
-    elif any(phrase in user_input_lower for phrase in ['calculate', 'math', 'add', 'subtract', 'multiply', 'divide']):
-        try:
-            if '+' in user_input or '-' in user_input or '*' in user_input or '/' in user_input:
-                result = eval(''.join([c for c in user_input if c in '0123456789+-*/.() ']))
-                return f"The answer is: {result} 🧮"
-        except:
-            return "I can help with basic math! Try asking something like 'What is 15 + 27?' or 'Calculate 100 divided by 4'"
-    
-    # Goodbye
-    elif any(phrase in user_input_lower for phrase in ['bye', 'goodbye', 'see you', 'exit', 'quit']):
-        return "Goodbye! 👋 It was nice chatting with you. Feel free to come back anytime!"
-    
-    # Thank you
-    elif any(phrase in user_input_lower for phrase in ['thank', 'thanks']):
-        return "You're welcome! 😊 I'm glad I could help. Is there anything else you'd like to know?"
-    
-    # Jokes
-    elif any(phrase in user_input_lower for phrase in ['joke', 'funny', 'make me laugh']):
-        jokes = [
-            "Why don't scientists trust atoms? Because they make up everything! 🤓",
-            "Why did the scarecrow win an award? He was outstanding in his field! 🌾",
-            "Why don't eggs tell jokes? They'd crack each other up! 🥚",
-            "What do you call a fake noodle? An impasta! 🍝"
-        ]
-        import random
-        return random.choice(jokes)
-    
-    # Default response for unknown queries
-    else:
-        responses = [
-            "That's an interesting question! I'm here to help and learn. 🤔",
-            "I'm not sure I understand completely. Could you rephrase that? 💭",
-            "That's a great question! Let me think about how to best answer that. 🧠",
-            "I'm here to chat and help! Could you tell me more about what you're looking for? 💬",
-            "I'm constantly learning new things. Could you ask me in a different way? 📚"
-        ]
-        import random
-        return random.choice(responses)
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dispatcher import ResponseDispatcher
+from chatview import ChatView
+from tracing import tracer
+
+# -------------------- ENGINE --------------------
+# Responses, storage and auth live in engine.py so they can run without the GUI
+from engine import (setup_database, get_chatbot_response, stream_chatbot_response, message_store,
+                    context_builder, HISTORY_PAGE_SIZE, register_user, authenticate, reset_password)
+STREAM_RESPONSES = True  # Set to False to wait for the full completion before showing it
+
+# -------------------- ASSETS --------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_IMAGE = os.path.join(BASE_DIR, "vvv.jpg")
+IMAGE_CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ai-chatbot", "images")
+
+def scaled_image_path(source, size):
+    """Path of a copy of ``source`` scaled to ``size``, made on first use and reused after.
+
+    Copies are named by the source's content hash and the size, so an edited
+    image or a new size never picks up a stale copy. They are stored as PPM,
+    which tk.PhotoImage loads directly; PIL is only imported to make a copy.
+    """
+    with open(source, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cached = os.path.join(IMAGE_CACHE_DIR, f"{digest}-{size[0]}x{size[1]}.ppm")
+    if not os.path.exists(cached):
+        from PIL import Image
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with Image.open(source) as image:
+            image.convert("RGB").resize(size).save(tmp, format="PPM")
+        os.replace(tmp, cached)
+    return cached
+
+# -------------------- AUTH WORKER --------------------
+# Password hashing is deliberately slow, so auth calls never run on the Tk thread
+auth_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="auth")
+
+def run_in_background(widget, func, args, on_done, poll_ms=20):
+    """Run func(*args) on the auth worker and call on_done(result, error) back on the Tk thread"""
+    future = auth_executor.submit(func, *args)
+
+    def check():
+        if not widget.winfo_exists():
+            return
+        if not future.done():
+            widget.after(poll_ms, check)
+            return
+        error = future.exception()
+        on_done(None if error else future.result(), error)
+
+    widget.after(poll_ms, check)
+
+# -------------------- STREAM RENDERER --------------------
+class StreamRenderer:
+    """Coalesce streamed deltas into one Text.insert per reply per frame.
+
+    Each streaming reply gets its own block in the chat view and a text mark
+    inside it, so several replies can grow in place at once. Also tracks
+    time-to-first-token and tokens per second.
+    """
+
+    def __init__(self, view, fps=30):
+        self.view = view
+        self.text = view.text
+        self.interval = max(1, int(1000 / fps))
+        self.buffers = {}   # request_id -> pending pieces
+        self.started = {}   # request_id -> perf_counter at submit
+        self.first_at = {}  # request_id -> perf_counter of first visible text
+        self.tokens = {}    # request_id -> number of deltas received
+        self.blocks = {}    # request_id -> chat view block being written
+        self.ttft = deque(maxlen=50)
+        self.tps = deque(maxlen=50)
+        self.job = None
+
+    def start(self, request_id):
+        self.started[request_id] = time.perf_counter()
+
+    def is_streaming(self, request_id):
+        return request_id in self.buffers
+
+    def feed(self, request_id, delta):
+        if request_id not in self.buffers:
+            self.buffers[request_id] = []
+            self.tokens[request_id] = 0
+            self.blocks[request_id] = self.view.open_block("🤖 Bot: \n\n")
+            self.text.mark_set(self.mark(request_id), "end-3c")
+        self.buffers[request_id].append(delta)
+        self.tokens[request_id] += 1
+        if self.job is None:
+            self.job = self.text.after(self.interval, self.flush)
+
+    def flush(self):
+        self.job = None
+        pending = [(rid, pieces) for rid, pieces in self.buffers.items() if pieces]
+        if not pending:
+            return
+        now = time.perf_counter()
+        with tracer.span("ui_stream"):
+            self.text.configure(state="normal")
+            for request_id, pieces in pending:
+                self.text.insert(self.mark(request_id), "".join(pieces))
+                pieces.clear()
+                if request_id not in self.first_at:
+                    self.first_at[request_id] = now
+                    self.ttft.append(now - self.started.get(request_id, now))
+            self.text.configure(state="disabled")
+            self.text.see(END)
+
+    def finish(self, request_id):
+        """Flush what is left of a reply and record its throughput"""
+        if self.job is not None:
+            self.text.after_cancel(self.job)
+        self.flush()
+        self.buffers.pop(request_id, None)
+        self.text.mark_unset(self.mark(request_id))
+        self.view.release(self.blocks.pop(request_id, None))
+        first_at = self.first_at.pop(request_id, None)
+        tokens = self.tokens.pop(request_id, 0)
+        self.started.pop(request_id, None)
+        if first_at is not None and tokens > 1:
+            elapsed = time.perf_counter() - first_at
+            if elapsed > 0:
+                self.tps.append(tokens / elapsed)
+
+    def discard(self, request_id):
+        self.started.pop(request_id, None)
+        if request_id in self.buffers:
+            self.finish(request_id)
+
+    def stats(self):
+        return {
+            "ttft_ms": sum(self.ttft) / len(self.ttft) * 1000 if self.ttft else None,
+            "tokens_per_sec": sum(self.tps) / len(self.tps) if self.tps else None,
+        }
+
+    @staticmethod
+    def mark(request_id):
+        return f"reply{request_id}"
+
+# -------------------- DEBUG PANEL --------------------
+class DebugPanel(tk.Frame):
+    """Live per-stage latency (p50/p95/p99) from the tracer; toggled with F12 in the chat window"""
+
+    def __init__(self, master, refresh_ms=500):
+        super().__init__(master, bg="black", bd=2, relief="ridge")
+        self.refresh_ms = refresh_ms
+        self.job = None
+        self.was_enabled = tracer.enabled
+        self.table = tk.Label(self, font=("Courier", 10), bg="black", fg="lime", justify="left", anchor="nw")
+        self.table.pack(fill="both", expand=True, padx=6, pady=6)
+        buttons = tk.Frame(self, bg="black")
+        buttons.pack(fill="x", padx=6, pady=(0, 6))
+        self.profile_button = tk.Button(buttons, text="Start profile", command=self.toggle_profile)
+        self.profile_button.pack(side="left")
+        self.memory_button = tk.Button(buttons, text="Start memory", command=self.toggle_memory)
+        self.memory_button.pack(side="left", padx=4)
+        tk.Button(buttons, text="Reset", command=tracer.reset).pack(side="left")
+        self.note = tk.Label(self, font=("Arial", 9), bg="black", fg="white", anchor="w")
+        self.note.pack(fill="x", padx=6)
+
+    def show(self):
+        self.was_enabled = tracer.enabled
+        tracer.enable()
+        self.place(relx=0.6, rely=0.025, relheight=0.75, relwidth=0.375)
+        self.lift()
+        self.refresh()
+
+    def hide(self):
+        if self.job is not None:
+            self.after_cancel(self.job)
+            self.job = None
+        if not self.was_enabled:
+            tracer.disable()
+        self.place_forget()
+
+    def toggle(self):
+        if self.winfo_ismapped():
+            self.hide()
+        else:
+            self.show()
+
+    def refresh(self):
+        rows = [f"{'stage':<18}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for stage, stats in tracer.snapshot().items():
+            rows.append(f"{stage:<18}{stats['count']:>7}{stats['p50_ms'] or 0:>9.2f}"
+                        f"{stats['p95_ms'] or 0:>9.2f}{stats['p99_ms'] or 0:>9.2f}")
+        self.table.config(text="\n".join(rows))
+        self.job = self.after(self.refresh_ms, self.refresh)
+
+    def toggle_profile(self):
+        if tracer.profiler is None:
+            tracer.start_profile()
+            self.profile_button.config(text="Stop profile")
+            self.note.config(text="Profiling the UI thread...")
+        else:
+            path = f"profile-{int(time.time())}.txt"
+            tracer.stop_profile(path=path)
+            self.profile_button.config(text="Start profile")
+            self.note.config(text=f"Profile written to {path}")
+
+    def toggle_memory(self):
+        if self.memory_button["text"] == "Start memory":
+            tracer.start_memory_tracking()
+            self.memory_button.config(text="Stop memory")
+            self.note.config(text="Tracking allocations...")
+        else:
+            path = f"memory-{int(time.time())}.txt"
+            tracer.memory_report(path=path)
+            self.memory_button.config(text="Start memory")
+            self.note.config(text=f"Allocation report written to {path}")
 
 # -------------------- CHATBOT WINDOW --------------------
 class ChatbotWindow(tk.Toplevel):
-    def __init__(self, master=None):
+    def __init__(self, master=None, user_id=None):
         super().__init__(master)
+        self.user_id = user_id
         self.title("Chatbot")
         self.geometry("1550x800")
         self.configure(bg="darkred")
         
-        # Create the chat log and text box
-        self.chatlog = scrolledtext.ScrolledText(self, font=("Arial", 14), wrap="word", state="disabled")
-        self.chatlog.configure(bg="blue", fg="white")
-        self.chatlog.place(relx=0.025, rely=0.025, relheight=0.75, relwidth=0.95)
+        # Create the chat log and text box; the log only keeps recent messages in the widget
+        self.conversation_id = None
+        self.history_cursor = None
+        self.chat_view = ChatView(self, page_size=HISTORY_PAGE_SIZE, load_older=self.load_older_messages,
+                                  font=("Arial", 14), wrap="word", bg="blue", fg="white")
+        self.chat_view.place(relx=0.025, rely=0.025, relheight=0.75, relwidth=0.95)
 
         self.textbox = tk.Entry(self, font=("Arial", 14), bd=2, relief="flat", bg="lightblue", fg="black")
-        self.textbox.place(relx=0.025, rely=0.8, relheight=0.1, relwidth=0.8)
+        self.textbox.place(relx=0.025, rely=0.8, relheight=0.1, relwidth=0.69)
         self.textbox.bind("<Return>", lambda event: self.on_send_button_click())
+        self.textbox.bind("<Escape>", lambda event: self.on_cancel_button_click())
+        self.debug_panel = DebugPanel(self)
+        self.bind("<F12>", lambda event: self.debug_panel.toggle())
+
+        self.cancel_button = tk.Button(self, text="Cancel", font=("Arial", 12), bg="gray20", fg="white",
+                                     relief="groove", bd=2, command=self.on_cancel_button_click)
+        self.cancel_button.place(relx=0.73, rely=0.8, relheight=0.1, relwidth=0.105)
 
         self.send_button = tk.Button(self, text="Send", font=("Arial", 12), bg="black", fg="white", 
                                    relief="groove", bd=2, command=self.on_send_button_click)
         self.send_button.place(relx=0.85, rely=0.8, relheight=0.1, relwidth=0.125)
+
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), bg="darkred", fg="white", anchor="w")
+        self.status_label.place(relx=0.025, rely=0.92, relheight=0.05, relwidth=0.95)
+
+        # Responses are computed on worker threads and drained back here with after()
+        handler = stream_chatbot_response if STREAM_RESPONSES else get_chatbot_response
+        self.dispatcher = ResponseDispatcher(handler, max_workers=4)
+        self.renderer = StreamRenderer(self.chat_view)
+        self.questions = {}
+        self.poll_responses()
         
-        # Add welcome message
-        self.chatlog.configure(state="normal")
-        self.chatlog.insert(END, "🤖 Bot: Welcome! I'm your AI assistant. How can I help you today?\n\n")
-        self.chatlog.insert(END, "You can ask me about:\n")
-        self.chatlog.insert(END, "• General knowledge and information\n")
-        self.chatlog.insert(END, "• Help with questions and problems\n") 
-        self.chatlog.insert(END, "• Casual conversation\n")
-        self.chatlog.insert(END, "• Calculations and facts\n")
-        self.chatlog.insert(END, "• And much more!\n\n")
-        self.chatlog.insert(END, "Just type your message and press Enter or click Send! 🚀\n\n")
-        self.chatlog.configure(state="disabled")
+        # Reopen the user's last conversation, newest page only
+        if self.user_id is not None:
+            self.conversation_id = message_store.latest_conversation(self.user_id)
+        if self.conversation_id is None:
+            self.conversation_id = message_store.new_conversation_id()
+            self.show_welcome()
+        else:
+            messages, self.history_cursor = message_store.load_page(self.user_id, self.conversation_id,
+                                                                    limit=HISTORY_PAGE_SIZE)
+            for block in self.format_history(messages):
+                self.append_text(block)
+            if not context_builder.turn_count(self.conversation_id):
+                context_builder.load(self.conversation_id, messages)
         
         self.textbox.focus()
 
+    def show_welcome(self):
+        self.append_text("🤖 Bot: Welcome! I'm your AI assistant. How can I help you today?\n\n"
+                         "You can ask me about:\n"
+                         "• General knowledge and information\n"
+                         "• Help with questions and problems\n"
+                         "• Casual conversation\n"
+                         "• Calculations and facts\n"
+                         "• And much more!\n\n"
+                         "Just type your message and press Enter or click Send! 🚀\n\n")
+
+    @staticmethod
+    def format_history(messages):
+        """One chat view block per stored message"""
+        return [f"👤 You: {content}\n" if role == "user" else f"🤖 Bot: {content}\n\n"
+                for role, content, created_at in messages]
+
+    def save_message(self, role, content):
+        if self.user_id is not None:
+            message_store.add(self.user_id, self.conversation_id, role, content)
+
+    def load_older_messages(self):
+        """Previous page of history for the chat view, once its own buffer is used up"""
+        if self.history_cursor is None:
+            return []
+        messages, self.history_cursor = message_store.load_page(self.user_id, self.conversation_id,
+                                                                before=self.history_cursor,
+                                                                limit=HISTORY_PAGE_SIZE)
+        return self.format_history(messages)
+
     def on_send_button_click(self):
         user_input = self.textbox.get().strip()
         self.textbox.delete(0, END)
 
         if not user_input:
-            self.chatlog.configure(state="normal")
-            self.chatlog.insert(END, "⚠️ Please enter a valid input.\n\n")
-            self.chatlog.configure(state="disabled")
+            self.append_text("⚠️ Please enter a valid input.\n\n")
+            return
+
+        request_id = self.dispatcher.submit(user_input, self.conversation_id)
+        if request_id is None:
+            self.append_text("⚠️ Too many questions in progress, please wait a moment.\n\n")
             return
+        self.questions[request_id] = user_input
+        self.renderer.start(request_id)
+        self.save_message("user", user_input)
 
         # Display user message
-        self.chatlog.configure(state="normal")
-        self.chatlog.insert(END, f"👤 You: {user_input}\n")
-        self.chatlog.configure(state="disabled")
-        
-        # Disable button while processing
-        self.send_button.config(state="disabled", text="Thinking...")
-        self.update_idletasks()
+        self.append_text(f"👤 You: {user_input}\n")
+        self.update_status()
 
-        # Get bot response
-        bot_response = get_chatbot_response(user_input)
-        
-        # Display bot response
-        self.chatlog.configure(state="normal")
-        self.chatlog.insert(END, f"🤖 Bot: {bot_response}\n\n")
-        self.chatlog.configure(state="disabled")
-        self.chatlog.see(END)
-        
-        # Re-enable button
-        self.send_button.config(state="normal", text="Send")
+    def on_cancel_button_click(self):
+        outstanding = self.dispatcher.outstanding()
+        if not outstanding:
+            return
+        request_id = outstanding[-1]
+        self.dispatcher.cancel(request_id)
+        self.renderer.discard(request_id)
+        question = self.questions.pop(request_id, "")
+        self.append_text(f"🚫 Cancelled: {question}\n\n")
+        self.update_status()
+
+    def poll_responses(self):
+        for event in self.dispatcher.drain():
+            self.on_response(*event)
+        if self.questions:
+            self.update_status()
+        self._poll_job = self.after(50, self.poll_responses)
+
+    def on_response(self, kind, request_id, payload):
+        if kind == "delta":
+            self.renderer.feed(request_id, payload)
+            return
+        question = self.questions.pop(request_id, None)
+        if kind == "done" and payload:
+            self.save_message("assistant", payload)
+        if self.renderer.is_streaming(request_id):
+            self.renderer.finish(request_id)
+            if kind == "error":
+                self.append_text(f"⚠️ Reply interrupted: {payload}\n\n")
+            self.update_status()
+            return
+        self.renderer.discard(request_id)
+        if kind == "error":
+            payload = f"Sorry, something went wrong: {payload}"
+        # Quote the question when answers arrive out of order
+        if question is not None and self.questions and min(self.questions) < request_id:
+            self.append_text(f"🤖 Bot (re: {question}): {payload}\n\n")
+        else:
+            self.append_text(f"🤖 Bot: {payload}\n\n")
+        self.update_status()
+
+    def append_text(self, text):
+        self.chat_view.append(text)
+
+    def update_status(self):
+        stats = self.dispatcher.stats()
+        if stats["queued"] or stats["running"]:
+            self.send_button.config(text=f"Send ({stats['queued'] + stats['running']})")
+            self.status_label.config(text=f"Thinking... queued: {stats['queued']}  running: {stats['running']}  "
+                                          f"avg wait: {stats['avg_wait_ms']:.0f} ms")
+        else:
+            self.send_button.config(text="Send")
+            stream_stats = self.renderer.stats()
+            if stream_stats["ttft_ms"] is None:
+                self.status_label.config(text="")
+            elif stream_stats["tokens_per_sec"] is None:
+                self.status_label.config(text=f"first token: {stream_stats['ttft_ms']:.0f} ms")
+            else:
+                self.status_label.config(text=f"first token: {stream_stats['ttft_ms']:.0f} ms  "
+                                              f"speed: {stream_stats['tokens_per_sec']:.1f} tokens/s")
+
+    def destroy(self):
+        self.after_cancel(self._poll_job)
+        self.debug_panel.hide()
+        if self.renderer.job is not None:
+            self.after_cancel(self.renderer.job)
+        if self.chat_view.flush_job is not None:
+            self.after_cancel(self.chat_view.flush_job)
+        self.dispatcher.shutdown()
+        super().destroy()
 
 # -------------------- LOGIN WINDOW --------------------
 class LoginWindow:
@@ -235,12 +405,7 @@ class LoginWindow:
 
         # Background image
         try:
-            BASE_DIR = os.path.dirname(__file__)
-            photo_dir = os.path.join(BASE_DIR, "photo")
-            self.bg_image_path = os.path.join(photo_dir, "vvv.jpg")
-            
-            bg_img = Image.open(self.bg_image_path).resize((1550, 800))
-            self.bg = ImageTk.PhotoImage(bg_img)
+            self.bg = tk.PhotoImage(file=scaled_image_path(BACKGROUND_IMAGE, (1550, 800)))
             tk.Label(self.root, image=self.bg).place(x=0, y=0, relwidth=1, relheight=1)
         except Exception as e:
             print(f"Background image error: {e}")
@@ -261,9 +426,9 @@ class LoginWindow:
         self.txtpass.pack(pady=5, ipady=5, ipadx=5, fill="x", padx=40)
         self.txtpass.bind('<Return>', lambda event: self.login())
 
-        login_btn = tk.Button(frame, text="Login", command=self.login, font=("Arial", 14, "bold"),
-                            fg="white", bg="#1a73e8", bd=0)
-        login_btn.pack(pady=20, ipadx=10, ipady=5)
+        self.login_btn = tk.Button(frame, text="Login", command=self.login, font=("Arial", 14, "bold"),
+                                   fg="white", bg="#1a73e8", bd=0)
+        self.login_btn.pack(pady=20, ipadx=10, ipady=5)
 
         register_btn = tk.Button(frame, text="New User Register", command=self.register_window,
                                font=("Arial", 12, "bold"), fg="white", bg="#f57c00", bd=0)
@@ -277,29 +442,27 @@ class LoginWindow:
         if self.txtuser.get() == "" or self.txtpass.get() == "":
             messagebox.showerror("Error", "All fields required")
             return
-        
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM register WHERE email=? AND password=?", 
-                             (self.txtuser.get(), self.txtpass.get()))
-                row = cursor.fetchone()
-                
-                if row:
-                    messagebox.showinfo("Success", f"Welcome {self.txtuser.get()}!")
-                    self.open_chatbot()
-                else:
-                    messagebox.showerror("Error", "Invalid Username or Password")
-                    
-            except sqlite3.Error as err:
-                messagebox.showerror("Database Error", f"{err}")
-            finally:
-                conn.close()
-
-    def open_chatbot(self):
+        if str(self.login_btn["state"]) == "disabled":
+            return
+
+        self.login_btn.config(state="disabled", text="Checking...")
+        run_in_background(self.root, authenticate, (self.txtuser.get(), self.txtpass.get()), self.on_login_done)
+
+    def on_login_done(self, row, error):
+        self.login_btn.config(state="normal", text="Login")
+        if isinstance(error, sqlite3.Error):
+            messagebox.showerror("Database Error", f"{error}")
+        elif error:
+            messagebox.showerror("Error", f"{error}")
+        elif row:
+            messagebox.showinfo("Success", f"Welcome {self.txtuser.get()}!")
+            self.open_chatbot(row[0])
+        else:
+            messagebox.showerror("Error", "Invalid Username or Password")
+
+    def open_chatbot(self, user_id=None):
         self.root.withdraw()
-        chatbot_window = ChatbotWindow(self.root)
+        chatbot_window = ChatbotWindow(self.root, user_id)
         chatbot_window.protocol("WM_DELETE_WINDOW", lambda: self.on_chatbot_close(chatbot_window))
 
     def on_chatbot_close(self, chatbot_window):
@@ -351,8 +514,9 @@ class RegisterWindow:
 
         self.create_label_entry("Security Answer", self.var_securityA, 50, 280)
 
-        tk.Button(self.top, text="Register", command=self.register_user, font=("Arial", 15, "bold"),
-                 fg="white", bg="#1b5e20").place(x=300, y=350, width=150, height=40)
+        self.register_btn = tk.Button(self.top, text="Register", command=self.register_user,
+                                      font=("Arial", 15, "bold"), fg="white", bg="#1b5e20")
+        self.register_btn.place(x=300, y=350, width=150, height=40)
 
     def create_label_entry(self, text, variable, x, y, show=None):
         tk.Label(self.top, text=text, font=("Arial", 14), bg="#ffffff").place(x=x, y=y)
@@ -367,25 +531,19 @@ class RegisterWindow:
             messagebox.showerror("Error", "All fields are required")
             return
 
-        # Hash the password before storing
-        hashed_password = hash_password(self.var_password.get())
-
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO register (fname,lname,email,password,securityQ,securityA) VALUES (?,?,?,?,?,?)",
-                             (self.var_fname.get(), self.var_lname.get(), self.var_email.get(), 
-                              hashed_password, self.var_securityQ.get(), self.var_securityA.get()))
-                conn.commit()
-                messagebox.showinfo("Success", "Registration Successful!")
-                self.top.destroy()
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Email already exists!")
-            except sqlite3.Error as err:
-                messagebox.showerror("Error", f"{err}")
-            finally:
-                conn.close()
+        self.register_btn.config(state="disabled")
+        run_in_background(self.top, register_user,
+                          (self.var_fname.get(), self.var_lname.get(), self.var_email.get(),
+                           self.var_password.get(), self.var_securityQ.get(), self.var_securityA.get()),
+                          self.on_register_done)
+
+    def on_register_done(self, user_id, error):
+        self.register_btn.config(state="normal")
+        if error:
+            messagebox.showerror("Error", f"{error}")
+        else:
+            messagebox.showinfo("Success", "Registration Successful!")
+            self.top.destroy()
 
 # -------------------- FORGOT PASSWORD WINDOW --------------------
 class ForgotPasswordWindow:
@@ -411,34 +569,31 @@ class ForgotPasswordWindow:
         self.txt_newpass = ttk.Entry(self.top, font=("Arial", 14), show="*")
         self.txt_newpass.pack(pady=5)
 
-        tk.Button(self.top, text="Reset Password", command=self.reset_pass, font=("Arial", 14, "bold"),
-                 fg="white", bg="#1b5e20").pack(pady=20)
+        self.reset_btn = tk.Button(self.top, text="Reset Password", command=self.reset_pass,
+                                   font=("Arial", 14, "bold"), fg="white", bg="#1b5e20")
+        self.reset_btn.pack(pady=20)
 
     def reset_pass(self):
         if self.combo_security_Q.get() == "Select" or not self.txt_security.get() or not self.txt_newpass.get():
             messagebox.showerror("Error", "All fields are required")
             return
 
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM register WHERE email=? AND securityQ=? AND securityA=?",
-                             (self.email, self.combo_security_Q.get(), self.txt_security.get()))
-                row = cursor.fetchone()
-                if row:
-                    # Hash the new password before storing
-                    hashed_password = hash_password(self.txt_newpass.get())
-                    cursor.execute("UPDATE register SET password=? WHERE email=?", (hashed_password, self.email))
-                    conn.commit()
-                    messagebox.showinfo("Success", "Password reset successful!")
-                    self.top.destroy()
-                else:
-                    messagebox.showerror("Error", "Incorrect security answer or question")
-            except sqlite3.Error as err:
-                messagebox.showerror("Database Error", f"{err}")
-            finally:
-                conn.close()
+        self.reset_btn.config(state="disabled")
+        run_in_background(self.top, reset_password,
+                          (self.email, self.combo_security_Q.get(), self.txt_security.get(), self.txt_newpass.get()),
+                          self.on_reset_done)
+
+    def on_reset_done(self, ok, error):
+        self.reset_btn.config(state="normal")
+        if isinstance(error, sqlite3.Error):
+            messagebox.showerror("Database Error", f"{error}")
+        elif error:
+            messagebox.showerror("Error", f"{error}")
+        elif ok:
+            messagebox.showinfo("Success", "Password reset successful!")
+            self.top.destroy()
+        else:
+            messagebox.showerror("Error", "Incorrect security answer or question")
 
 # -------------------- MAIN --------------------
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""Bounded chat log: only a window of recent messages lives in the Text widget.
+
+Each message is a "block" of text ending in a newline, tracked by a mark at
+its first line. Blocks that fall out of the window are moved into ring
+buffers (``above`` / ``below``) and inserted again when the user scrolls to
+that edge; past the ring buffer, ``load_older`` can fetch more (for example
+from the message store). Appends made during one event-loop tick are
+written with a single insert.
+"""
+from collections import deque
+from tkinter import END, scrolledtext
+
+from tracing import tracer
+
+class ChatView:
+    def __init__(self, master, max_visible=300, page_size=50, history_limit=5000, load_older=None, **options):
+        self.text = scrolledtext.ScrolledText(master, state="disabled", **options)
+        self.text.configure(yscrollcommand=self.on_scroll)
+        self.max_visible = max_visible
+        self.page_size = page_size
+        self.load_older = load_older            # () -> list of older blocks, oldest first; [] when none left
+        self.blocks = deque()                   # marks of the blocks in the widget, oldest first
+        self.above = deque(maxlen=history_limit)  # trimmed older blocks, oldest first
+        self.below = deque()                    # trimmed newer blocks while browsing history
+        self.live = set()                       # blocks still being written (never trimmed)
+        self.pending = []
+        self.flush_job = None
+        self.paging = False
+        self.counter = 0
+        self.inserts = 0
+
+    def place(self, **options):
+        self.text.place(**options)
+
+    # -------------------- APPENDING --------------------
+    def append(self, text):
+        """Queue a block for the end of the log; written on the next idle tick"""
+        self.pending.append(text)
+        if self.flush_job is None:
+            self.flush_job = self.text.after_idle(self.flush)
+
+    def flush(self):
+        """Write every queued block with one insert, then trim the window"""
+        self.flush_job = None
+        if not self.pending:
+            return
+        blocks, self.pending = self.pending, []
+        with tracer.span("ui_render"):
+            if self.below:
+                self.jump_to_latest()
+            self.insert_blocks(END, blocks)
+            self.trim_top()
+            self.text.see(END)
+
+    def open_block(self, text):
+        """Write a block right away and keep it in the widget until release(); returns its mark"""
+        self.flush()
+        if self.below:
+            self.jump_to_latest()
+        mark = self.insert_blocks(END, [text])[0]
+        self.live.add(mark)
+        self.trim_top()
+        self.text.see(END)
+        return mark
+
+    def release(self, mark):
+        self.live.discard(mark)
+
+    # -------------------- WINDOW --------------------
+    def insert_blocks(self, index, blocks):
+        """Insert blocks at END or "1.0" with one Text.insert; returns their new marks"""
+        at_end = index == END
+        line = int(self.text.index("end-1c").split(".")[0]) if at_end else 1
+        if at_end and self.text.index("end-1c") != f"{line}.0":
+            line += 1  # widget content did not end with a newline
+        marks = []
+        for block in blocks:
+            self.counter += 1
+            marks.append(f"block{self.counter}")
+        self.text.configure(state="normal")
+        self.text.insert(index, "".join(blocks))
+        self.text.configure(state="disabled")
+        self.inserts += 1
+        for mark, block in zip(marks, blocks):
+            self.text.mark_set(mark, f"{line}.0")
+            line += block.count("\n")
+        if at_end:
+            self.blocks.extend(marks)
+        else:
+            self.blocks.extendleft(reversed(marks))
+        return marks
+
+    def block_end(self, position):
+        return self.blocks[position + 1] if position + 1 < len(self.blocks) else "end-1c"
+
+    def trim_top(self):
+        """Move the oldest blocks into ``above`` until the window fits"""
+        excess = len(self.blocks) - self.max_visible
+        count = 0
+        while count < excess and self.blocks[count] not in self.live:
+            count += 1
+        if not count:
+            return
+        end = self.blocks[count]
+        if len(self.above) + count > self.above.maxlen:
+            self.load_older = None  # the ring buffer drops blocks, so older pages would leave a gap
+        for position in range(count):
+            self.above.append(self.text.get(self.blocks[position], self.block_end(position)))
+        self.text.configure(state="normal")
+        self.text.delete("1.0", end)
+        self.text.configure(state="disabled")
+        for _ in range(count):
+            self.text.mark_unset(self.blocks.popleft())
+
+    def trim_bottom(self):
+        """Move the newest blocks into ``below`` until the window fits"""
+        excess = len(self.blocks) - self.max_visible
+        count = 0
+        while count < excess and self.blocks[-1 - count] not in self.live:
+            count += 1
+        if not count:
+            return
+        start = self.blocks[-count]
+        texts = [self.text.get(self.blocks[position], self.block_end(position))
+                 for position in range(len(self.blocks) - count, len(self.blocks))]
+        self.below.extendleft(reversed(texts))
+        self.text.configure(state="normal")
+        self.text.delete(start, "end-1c")
+        self.text.configure(state="disabled")
+        for _ in range(count):
+            self.text.mark_unset(self.blocks.pop())
+
+    def jump_to_latest(self):
+        """Put the newest blocks back after browsing history"""
+        while self.below:
+            page = [self.below.popleft() for _ in range(min(self.page_size * 4, len(self.below)))]
+            self.insert_blocks(END, page)
+            self.trim_top()
+
+    # -------------------- SCROLLING --------------------
+    def on_scroll(self, first, last):
+        self.text.vbar.set(first, last)
+        if self.paging:
+            return
+        if float(first) <= 0.0 and (self.above or self.load_older is not None):
+            self.paging = True
+            self.text.after_idle(self.page_up)
+        elif float(last) >= 1.0 and self.below:
+            self.paging = True
+            self.text.after_idle(self.page_down)
+
+    def page_up(self):
+        """Bring back the previous page of older blocks, keeping the current top line in view"""
+        try:
+            if self.above:
+                page = [self.above.pop() for _ in range(min(self.page_size, len(self.above)))][::-1]
+            else:
+                page = self.load_older() if self.load_older is not None else []
+                if not page:
+                    self.load_older = None  # nothing older anywhere
+            if page and self.blocks:
+                anchor = self.blocks[0]
+                self.insert_blocks("1.0", page)
+                self.trim_bottom()
+                self.text.yview(anchor)
+            elif page:
+                self.insert_blocks(END, page)
+        finally:
+            self.paging = False
+
+    def page_down(self):
+        try:
+            page = [self.below.popleft() for _ in range(min(self.page_size, len(self.below)))]
+            if page:
+                anchor = self.blocks[-1] if self.blocks else None
+                self.insert_blocks(END, page)
+                self.trim_top()
+                if anchor is not None and anchor in self.blocks:
+                    self.text.yview(anchor)
+        finally:
+            self.paging = False
+
+    def stats(self):
+        return {"visible": len(self.blocks), "above": len(self.above), "below": len(self.below),
+                "inserts": self.inserts}
@@ -0,0 +1,205 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------- TOKEN COUNTING --------------------
+PIECE = re.compile(r"\w+|[^\w\s]")
+ENCODING = None
+encoding_loaded = False
+
+def get_encoding():
+    """tiktoken's encoding, loaded on first use (slow to import); None if not installed"""
+    global ENCODING, encoding_loaded
+    if not encoding_loaded:
+        encoding_loaded = True
+        try:
+            import tiktoken
+            ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # optional dependency
+            ENCODING = None
+    return ENCODING
+
+def count_tokens(text):
+    """Token count with tiktoken if installed, otherwise a close estimate"""
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly one token per short word or punctuation mark, long words split every ~4 chars
+    return sum((len(piece) + 3) // 4 for piece in PIECE.findall(text)) + 1
+
+MESSAGE_OVERHEAD = 4  # role and separators the API adds per message
+
+def extractive_summary(previous, turns, budget):
+    """Cheap summary: the first sentence of each turn, newest kept when over budget"""
+    lines = [previous] if previous else []
+    for role, content in turns:
+        first = re.split(r"(?<=[.!?])\s", content.strip(), maxsplit=1)[0]
+        lines.append(f"{'User' if role == 'user' else 'Assistant'}: {first}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+# -------------------- CONTEXT BUILDER --------------------
+class ContextBuilder:
+    """Per-conversation history packed into a fixed prompt token budget.
+
+    Token counts are computed once, when a message is added. ``build`` keeps
+    the newest messages that fit in ``budget``. Messages that no longer fit
+    are folded into a rolling summary, which is only regenerated once
+    ``stale_after`` or more turns (a user message and its reply) have dropped
+    out of the window since the last one. The ``summarizer`` runs on a
+    background thread and requests keep using the previous summary until it
+    is done; the first summary of a conversation is an extractive one, so
+    folded turns are never simply lost. Prompt size stays bounded however
+    long the conversation gets.
+    """
+
+    def __init__(self, budget=1200, summary_budget=200, stale_after=6, summarizer=None, max_conversations=1000):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.stale_after = stale_after
+        self.summarizer = summarizer
+        self.max_conversations = max_conversations
+        self.conversations = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.stats = {"requests": 0, "tokens_sent": 0, "tokens_full": 0, "summaries": 0}
+
+    def conversation(self, conversation_id):
+        # Called with self.lock held
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            if len(self.conversations) >= self.max_conversations:
+                self.conversations.pop(next(iter(self.conversations)))
+            conversation = self.conversations[conversation_id] = {
+                "messages": [],        # [role, content, tokens]
+                "total_tokens": 0,
+                "summary": "",
+                "summary_tokens": 0,
+                "summarized_upto": 0,  # messages before this index are in the summary
+                "summarizing": False,  # a background summary is running
+                "version": None,       # caller's marker for the stored history this copy matches
+            }
+        return conversation
+
+    def turn_count(self, conversation_id):
+        with self.lock:
+            conversation = self.conversations.get(conversation_id)
+            return len(conversation["messages"]) if conversation else 0
+
+    def add(self, conversation_id, role, content):
+        tokens = count_tokens(content) + MESSAGE_OVERHEAD
+        with self.lock:
+            conversation = self.conversation(conversation_id)
+            conversation["messages"].append([role, content, tokens])
+            conversation["total_tokens"] += tokens
+
+    def load(self, conversation_id, messages):
+        """Seed a conversation from stored (role, content, ...) history"""
+        for message in messages:
+            self.add(conversation_id, "user" if message[0] == "user" else "assistant", message[1])
+
+    def replace(self, conversation_id, messages, version):
+        """Drop what is held for a conversation and load stored history tagged with ``version``"""
+        with self.lock:
+            self.conversations.pop(conversation_id, None)
+        self.load(conversation_id, messages)
+        self.set_version(conversation_id, version)
+
+    def version(self, conversation_id):
+        with self.lock:
+            conversation = self.conversations.get(conversation_id)
+            return conversation["version"] if conversation else None
+
+    def set_version(self, conversation_id, version):
+        with self.lock:
+            self.conversation(conversation_id)["version"] = version
+
+    def build(self, conversation_id, system_prompt, user_input):
+        """Chat messages for the next request, within the token budget"""
+        system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD
+        user_tokens = count_tokens(user_input) + MESSAGE_OVERHEAD
+        with self.lock:
+            conversation = self.conversation(conversation_id)
+            messages = conversation["messages"]
+
+            # Newest turns first until the budget (minus room for a summary) runs out
+            available = self.budget - system_tokens - user_tokens - self.summary_budget
+            cut = len(messages)
+            while cut > 0 and messages[cut - 1][2] <= available:
+                cut -= 1
+                available -= messages[cut][2]
+
+            turns = [(role, content) for role, content, _ in messages[conversation["summarized_upto"]:cut]]
+            folded_turns = sum(1 for role, _ in turns if role == "user")
+            previous = conversation["summary"]
+            refresh = bool(turns) and (not previous or folded_turns >= self.stale_after)
+            schedule = refresh and self.summarizer is not None and not conversation["summarizing"]
+            if schedule:
+                conversation["summarizing"] = True
+            if refresh and self.summarizer is not None:
+                # Until the summarizer is done, reuse the summary there is, or an extractive one if none
+                refresh = not previous
+            recent = [{"role": role, "content": content} for role, content, _ in messages[cut:]]
+            full_tokens = system_tokens + user_tokens + conversation["total_tokens"]
+
+        if schedule:
+            self.background().submit(self.refresh_summary, conversation_id, conversation, previous, turns, cut)
+        if refresh:
+            self.store_summary(conversation, extractive_summary(previous, turns, self.summary_budget), cut)
+
+        with self.lock:
+            summary = conversation["summary"]
+            sent = system_tokens + user_tokens + sum(m[2] for m in messages[cut:])
+            if summary:
+                sent += conversation["summary_tokens"]
+            self.stats["requests"] += 1
+            self.stats["tokens_sent"] += sent
+            self.stats["tokens_full"] += full_tokens
+
+        if summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+        return [{"role": "system", "content": system_prompt}] + recent + [{"role": "user", "content": user_input}]
+
+    def background(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+            return self.executor
+
+    def refresh_summary(self, conversation_id, conversation, previous, turns, cut):
+        try:
+            summary = self.summarize(previous, turns)
+        finally:
+            with self.lock:
+                conversation["summarizing"] = False
+                # replace() may have dropped this copy of the conversation meanwhile
+                current = self.conversations.get(conversation_id) is conversation
+        if current:
+            self.store_summary(conversation, summary, cut)
+
+    def store_summary(self, conversation, summary, cut):
+        tokens = count_tokens(summary)
+        with self.lock:
+            if cut < conversation["summarized_upto"]:
+                return
+            conversation["summary"] = summary
+            conversation["summary_tokens"] = tokens
+            conversation["summarized_upto"] = cut
+            self.stats["summaries"] += 1
+
+    def summarize(self, previous, turns):
+        if self.summarizer is not None:
+            try:
+                summary = self.summarizer(previous, turns)
+                if summary and count_tokens(summary) <= self.summary_budget:
+                    return summary
+            except Exception as e:
+                print(f"Summary Error: {e}")
+        return extractive_summary(previous, turns, self.summary_budget)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["tokens_saved"] = stats["tokens_full"] - stats["tokens_sent"]
+        return stats
@@ -0,0 +1,173 @@
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from tracing import tracer
+
+# -------------------- MIGRATIONS --------------------
+# Applied in order; PRAGMA user_version records the last one that ran.
+# Never edit a migration that has shipped - add a new one instead.
+MIGRATIONS = [
+    ("create register table", [
+        """
+        CREATE TABLE IF NOT EXISTS register (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fname TEXT NOT NULL,
+            lname TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            securityQ TEXT NOT NULL,
+            securityA TEXT NOT NULL
+        )
+        """,
+    ]),
+    ("create response cache", [
+        """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            latency REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used)",
+    ]),
+    ("create messages table", [
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            conversation_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (user_id, conversation_id, created_at)",
+    ]),
+    ("index messages by user and time", [
+        # latest_conversation reads a user's newest message without sorting all of them
+        "CREATE INDEX IF NOT EXISTS idx_messages_user_created ON messages (user_id, created_at)",
+    ]),
+]
+
+# -------------------- CONNECTION MANAGER --------------------
+class ThreadOwner:
+    """Stored in a thread's locals so a finalizer can tell when the thread is gone"""
+
+class ConnectionManager:
+    """One long-lived, tuned SQLite connection per thread.
+
+    Connections are opened on first use in each thread and reused after that,
+    and closed when that thread exits.
+    Each one uses WAL, synchronous=NORMAL and memory-mapped I/O, and caches
+    prepared statements. The schema is migrated once, before the first
+    connection is handed out. ``execute`` records per-query timings.
+    """
+
+    def __init__(self, db_name, mmap_size=256 * 1024 * 1024, cached_statements=256, busy_timeout=5000):
+        self.db_name = db_name
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.migrated = False
+        self.stats = {}  # sql -> [count, total seconds, max seconds]
+
+    def open(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.open()
+            with self.lock:
+                if not self.migrated:
+                    self.migrate(conn)
+                    self.migrated = True
+                self.connections.append(conn)
+            self.local.conn = conn
+            # A thread's locals are dropped when it exits; the owner going with
+            # them closes the connection instead of leaving it open for good
+            self.local.owner = owner = ThreadOwner()
+            weakref.finalize(owner, self.release, conn)
+        return conn
+
+    def release(self, conn):
+        """Close a connection whose thread has exited"""
+        with self.lock:
+            if conn in self.connections:
+                self.connections.remove(conn)
+        conn.close()
+
+    def migrate(self, conn):
+        """Apply any migrations newer than the database's user_version"""
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        for number, (description, statements) in enumerate(MIGRATIONS, start=1):
+            if number <= version:
+                continue
+            with conn:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={number}")
+            print(f"Applied migration {number}: {description}")
+
+    def record(self, sql, elapsed):
+        tracer.record("db", elapsed)
+        with self.lock:
+            entry = self.stats.get(sql)
+            if entry is None:
+                self.stats[sql] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        cursor = self.connection().execute(sql, params)
+        self.record(sql, time.perf_counter() - start)
+        return cursor
+
+    def executemany(self, sql, rows):
+        start = time.perf_counter()
+        cursor = self.connection().executemany(sql, rows)
+        self.record(sql, time.perf_counter() - start)
+        return cursor
+
+    @contextmanager
+    def transaction(self):
+        """Commit on success, roll back on error"""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def query_stats(self):
+        """Per-statement count, total and mean/max milliseconds, slowest total first"""
+        with self.lock:
+            items = [(sql, list(entry)) for sql, entry in self.stats.items()]
+        report = [{"sql": " ".join(sql.split()), "count": count, "total_ms": total * 1000,
+                   "mean_ms": total / count * 1000, "max_ms": worst * 1000}
+                  for sql, (count, total, worst) in items]
+        return sorted(report, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def close_all(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
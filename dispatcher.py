@@ -0,0 +1,118 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------- RESPONSE DISPATCHER --------------------
+class ResponseDispatcher:
+    """Run a blocking response function on a bounded thread pool.
+
+    Results are handed back through a queue so the Tk thread only ever does a
+    non-blocking drain from an ``after()`` callback. If the handler returns an
+    iterator of text pieces instead of a string, each piece is queued as a
+    ``"delta"`` event followed by a ``"done"`` event carrying the full text.
+    """
+
+    def __init__(self, handler, max_workers=4, max_pending=16):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chatbot-worker")
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = {}       # request_id -> future
+        self.submitted_at = {}  # request_id -> perf_counter at submit
+        self.running = set()
+        self.wait_times = deque(maxlen=200)
+        self.completed = 0
+        self._ids = itertools.count(1)
+
+    def submit(self, *args):
+        """Queue a request and return its id, or None if too many are outstanding"""
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                return None
+            request_id = next(self._ids)
+            self.submitted_at[request_id] = time.perf_counter()
+            self.pending[request_id] = self.executor.submit(self._run, request_id, args)
+        return request_id
+
+    def _run(self, request_id, args):
+        with self.lock:
+            if request_id not in self.pending:
+                return
+            self.running.add(request_id)
+            self.wait_times.append(time.perf_counter() - self.submitted_at[request_id])
+        try:
+            result = self.handler(*args)
+            if result is None or isinstance(result, str):
+                self.results.put(("done", request_id, result))
+                return
+            parts = []
+            for delta in result:
+                if request_id not in self.pending:
+                    if hasattr(result, "close"):
+                        result.close()
+                    return
+                parts.append(delta)
+                self.results.put(("delta", request_id, delta))
+            self.results.put(("done", request_id, "".join(parts)))
+        except Exception as e:
+            self.results.put(("error", request_id, e))
+
+    def cancel(self, request_id):
+        """Cancel a request; if it is already running its result is discarded"""
+        with self.lock:
+            future = self.pending.pop(request_id, None)
+            if future is None:
+                return False
+            self.submitted_at.pop(request_id, None)
+            self.running.discard(request_id)
+        future.cancel()
+        return True
+
+    def outstanding(self):
+        with self.lock:
+            return sorted(self.pending)
+
+    def drain(self):
+        """Return all finished (kind, request_id, payload) events without blocking"""
+        events = []
+        while True:
+            try:
+                kind, request_id, payload = self.results.get_nowait()
+            except queue.Empty:
+                return events
+            with self.lock:
+                if request_id not in self.pending:
+                    continue  # cancelled
+                if kind == "delta":
+                    events.append((kind, request_id, payload))
+                    continue
+                self.pending.pop(request_id, None)
+                self.submitted_at.pop(request_id, None)
+                self.running.discard(request_id)
+                self.completed += 1
+            events.append((kind, request_id, payload))
+
+    def stats(self):
+        """Queue depth and wait time (seconds a request sat before a worker picked it up)"""
+        now = time.perf_counter()
+        with self.lock:
+            queued = [now - self.submitted_at[rid] for rid in self.pending
+                      if rid not in self.running and rid in self.submitted_at]
+            waits = list(self.wait_times)
+            return {
+                "queued": len(queued),
+                "running": len(self.running),
+                "completed": self.completed,
+                "oldest_wait_ms": max(queued) * 1000 if queued else 0.0,
+                "avg_wait_ms": sum(waits) / len(waits) * 1000 if waits else 0.0,
+                "max_wait_ms": max(waits) * 1000 if waits else 0.0,
+            }
+
+    def shutdown(self):
+        with self.lock:
+            self.pending.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
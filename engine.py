@@ -0,0 +1,419 @@
+"""UI-independent chatbot engine: configuration, storage, auth and responses.
+
+Used by the Tkinter app (chatbot.py) and the HTTP service (service.py).
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import intents
+import passwords
+from passwords import PasswordPolicy
+from cache import ResponseCache, Flight
+from history import MessageStore
+from db import ConnectionManager
+from context import ContextBuilder
+from router import BackendRouter, CircuitBreaker
+from tracing import tracer
+
+# -------------------- CONFIG --------------------
+# openai, numpy (vectorstore) and tiktoken are imported on first use, so startup stays fast
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Use environment variable
+DB_NAME = "chatbot.db"
+VECTOR_DIR = "vectors"  # Semantic cache and knowledge base (see vectorstore.py)
+OPENAI_BUDGET = float(os.getenv("OPENAI_BUDGET_S", "8"))  # hard ceiling per reply before answering locally
+
+# -------------------- PASSWORD HASHING --------------------
+# Work factor is calibrated in the background at startup to hit this verify time
+password_policy = PasswordPolicy(os.getenv("PASSWORD_ALGORITHM", "scrypt"),
+                                 float(os.getenv("PASSWORD_TARGET_MS", "100")) / 1000)
+
+def hash_password(password):
+    """Hash a password with the calibrated KDF; the result records algorithm and parameters"""
+    with tracer.span("password_hash"):
+        return password_policy.hash(password)
+
+def verify_password(password, stored_hash):
+    """Verify a password against a stored hash in any supported format"""
+    with tracer.span("password_verify"):
+        return passwords.verify(password, stored_hash)
+
+# -------------------- DATABASE SETUP --------------------
+# One long-lived connection per thread, shared by every part of the app
+db = ConnectionManager(DB_NAME)
+
+def setup_database():
+    """Open the database and apply any pending schema migrations"""
+    password_policy.start_calibration()
+    try:
+        db.connection()
+        print("Database ready!")
+    except sqlite3.Error as err:
+        print(f"Database Error: {err}")
+
+# -------------------- AUTH --------------------
+class AuthError(Exception):
+    """A registration, login or reset request that cannot be completed"""
+
+SECURITY_QUESTIONS = ("Your Birth Place", "Your Mother Name", "Your Pet Name")
+
+def register_user(fname, lname, email, password, securityQ, securityA):
+    """Create an account and return its id"""
+    if not all([fname, lname, email, password]):
+        raise AuthError("All fields are required")
+    hashed_password = hash_password(password)
+    try:
+        with db.transaction():
+            cursor = db.execute("INSERT INTO register (fname,lname,email,password,securityQ,securityA) "
+                                "VALUES (?,?,?,?,?,?)",
+                                (fname, lname, email, hashed_password, securityQ, securityA))
+        return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        raise AuthError("Email already exists!")
+
+def authenticate(email, password):
+    """Return the user's register row if the password matches, else None"""
+    row = db.execute("SELECT * FROM register WHERE email=?", (email,)).fetchone()
+    if not row:
+        # Same work as a wrong password, so response time does not reveal which emails exist
+        verify_password(password, password_policy.dummy_hash())
+        return None
+    if not verify_password(password, row[4]):
+        return None
+    if password_policy.needs_rehash(row[4]):
+        # Upgrade legacy or outdated hashes while the plain password is at hand
+        try:
+            with db.transaction():
+                db.execute("UPDATE register SET password=? WHERE id=? AND password=?",
+                           (hash_password(password), row[0], row[4]))
+        except sqlite3.Error as err:
+            print(f"Database Error: {err}")
+    return row
+
+def reset_password(email, securityQ, securityA, new_password):
+    """Set a new password if the security answer matches; returns True on success"""
+    row = db.execute("SELECT id FROM register WHERE email=? AND securityQ=? AND securityA=?",
+                     (email, securityQ, securityA)).fetchone()
+    if not row:
+        return False
+    hashed_password = hash_password(new_password)
+    with db.transaction():
+        db.execute("UPDATE register SET password=? WHERE email=?", (hashed_password, email))
+    return True
+
+# -------------------- CHATBOT RESPONSES --------------------
+SYSTEM_PROMPT = "You are a helpful and friendly AI assistant. Provide clear, concise, and helpful responses."
+OPENAI_PARAMS = {"model": "gpt-3.5-turbo", "max_tokens": 300, "temperature": 0.7}
+
+# Repeated questions are answered from here instead of calling OpenAI again
+response_cache = ResponseCache(db)
+message_store = MessageStore(db)
+HISTORY_PAGE_SIZE = 50
+# Deadline, retries and circuit breaker for every OpenAI chat call (see router.py)
+router = BackendRouter("openai", budget=OPENAI_BUDGET, retries=2, breaker=CircuitBreaker(threshold=5, cooldown=30))
+vector_stores = {}
+vector_lock = threading.Lock()
+
+def get_openai():
+    import openai
+    if openai.api_key is None:
+        openai.api_key = OPENAI_API_KEY
+    return openai
+
+def get_vector_store(name):
+    """Open a vector store under VECTOR_DIR on first use"""
+    from vectorstore import VectorStore
+    with vector_lock:
+        if name not in vector_stores:
+            vector_stores[name] = VectorStore(os.path.join(VECTOR_DIR, name))
+        return vector_stores[name]
+
+semantic_cache = None
+knowledge_base = None
+
+def get_semantic_cache():
+    global semantic_cache
+    if semantic_cache is None:
+        from vectorstore import SemanticCache
+        semantic_cache = SemanticCache(get_vector_store("prompts"))
+    return semantic_cache
+
+def get_knowledge_base():
+    global knowledge_base
+    if knowledge_base is None:
+        from vectorstore import KnowledgeBase
+        knowledge_base = KnowledgeBase(get_vector_store("knowledge"))
+    return knowledge_base
+
+def openai_enabled():
+    return bool(OPENAI_API_KEY) and OPENAI_API_KEY != "your_openai_api_key_here"
+
+def build_messages(user_input, conversation_id=None):
+    system_prompt = SYSTEM_PROMPT
+    snippets = get_knowledge_base().retrieve(user_input)
+    if snippets:
+        system_prompt += "\n\nUse this context if it is relevant:\n" + "\n".join(f"- {s}" for s in snippets)
+    if conversation_id is not None:
+        return context_builder.build(conversation_id, system_prompt, user_input)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_input}
+    ]
+
+def has_context(conversation_id):
+    """Replies that depend on earlier turns must not come from the caches"""
+    return conversation_id is not None and context_builder.turn_count(conversation_id) > 0
+
+def remember_turn(conversation_id, user_input, answer):
+    if conversation_id is not None:
+        context_builder.add(conversation_id, "user", user_input)
+        context_builder.add(conversation_id, "assistant", answer)
+
+def get_chatbot_response(user_input, conversation_id=None):
+    """Get response from OpenAI or fallback to predefined responses"""
+    with tracer.span("reply"):
+        return answer_chatbot(user_input, conversation_id)
+
+def answer_chatbot(user_input, conversation_id=None):
+    # First try OpenAI
+    try:
+        if openai_enabled():
+            if has_context(conversation_id):
+                answer = router.call(lambda timeout: ask_openai(user_input, conversation_id, timeout))
+            else:
+                answer = response_cache.get_or_compute(
+                    user_input, OPENAI_PARAMS, lambda: router.call(lambda timeout: ask_openai(user_input, timeout=timeout)))
+            remember_turn(conversation_id, user_input, answer)
+            return answer
+    except Exception as e:
+        print(f"OpenAI Error: {e}")
+        # Fall through to predefined responses
+    
+    answer = get_fallback_response(user_input)
+    remember_turn(conversation_id, user_input, answer)
+    return answer
+
+def ask_openai(user_input, conversation_id=None, timeout=None, semantic=True):
+    """One OpenAI chat call; ``semantic=False`` skips the semantic cache lookup and insert"""
+    semantic = semantic and conversation_id is None
+    if semantic:
+        # Near-duplicates of earlier questions reuse the earlier answer
+        answer = get_semantic_cache().lookup(user_input)
+        if answer is not None:
+            return answer
+    response = get_openai().ChatCompletion.create(messages=build_messages(user_input, conversation_id),
+                                            request_timeout=timeout, **OPENAI_PARAMS)
+    answer = response.choices[0].message.content.strip()
+    if semantic:
+        get_semantic_cache().add(user_input, answer)
+    return answer
+
+def stream_chatbot_response(user_input, conversation_id=None):
+    """Yield the response in pieces as they arrive from OpenAI.
+
+    Falls back to the predefined responses (as a single piece) when OpenAI is
+    unavailable or fails before sending anything.
+    """
+    streamed = False
+    flight = None
+    try:
+        if openai_enabled():
+            flight, cached, messages = prepare_request(user_input, conversation_id)
+            if cached is not None:
+                yield cached
+                return
+            first, response = router.call(lambda timeout: open_stream(messages, timeout))
+            parts = []
+            for chunk in itertools.chain(first, response):
+                delta = chunk.choices[0].delta.get("content")
+                if delta:
+                    streamed = True
+                    parts.append(delta)
+                    yield delta
+            if streamed:
+                finish_request(flight, user_input, conversation_id, "".join(parts).strip())
+                flight = None
+                return
+    except Exception as e:
+        print(f"OpenAI Error: {e}")
+        if streamed:
+            return
+    finally:
+        abandon_request(flight)
+
+    answer = get_fallback_response(user_input)
+    remember_turn(conversation_id, user_input, answer)
+    yield answer
+
+def open_stream(messages, timeout):
+    """Start a streamed completion; returns ([first chunk], the rest) once the first chunk is in"""
+    response = iter(get_openai().ChatCompletion.create(messages=messages, stream=True, request_timeout=timeout,
+                                                       **OPENAI_PARAMS))
+    return list(itertools.islice(response, 1)), response
+
+def prepare_request(user_input, conversation_id=None):
+    """Return (flight, cached answer, chat messages) for a streamed request.
+
+    On a cache miss the caller leads the upstream call for this prompt and
+    gets its flight, which must be ended with finish_request() or
+    abandon_request(). Identical prompts arriving meanwhile wait here for the
+    leader and then replay its answer from the cache, or lead a new call if
+    it failed. flight is None for replies that depend on earlier turns (never
+    cached); messages is None when a cached answer was found.
+    """
+    while True:
+        request = begin_request(user_input, conversation_id)
+        if not isinstance(request, Flight):
+            return request
+        request.event.wait()
+
+def begin_request(user_input, conversation_id=None):
+    """One try of prepare_request(); returns the Flight to wait for when an identical request is in progress"""
+    if has_context(conversation_id):
+        return None, None, build_messages(user_input, conversation_id)
+    cached, flight, leader = response_cache.join(response_cache.make_key(user_input, OPENAI_PARAMS))
+    if flight is not None and not leader:
+        return flight
+    try:
+        if cached is None:
+            cached = get_semantic_cache().lookup(user_input)
+            if cached is not None:
+                response_cache.complete(flight, cached)
+                flight = None
+        if cached is not None:
+            remember_turn(conversation_id, user_input, cached)
+            return None, cached, None
+        return flight, None, build_messages(user_input, conversation_id)
+    except BaseException as e:
+        abandon_request(flight, e)
+        raise
+
+def finish_request(flight, user_input, conversation_id, answer):
+    remember_turn(conversation_id, user_input, answer)
+    if flight is not None:
+        response_cache.complete(flight, answer)
+        get_semantic_cache().add(user_input, answer)
+
+def abandon_request(flight, error=None):
+    """End a flight without an answer, so waiting requests go upstream themselves"""
+    if flight is not None:
+        response_cache.complete(flight, error=error or RuntimeError("upstream call abandoned"))
+
+def summarize_with_openai(previous, turns):
+    """Fold older turns into the rolling conversation summary"""
+    if not openai_enabled():
+        return None
+    transcript = "\n".join(f"{role}: {content}" for role, content in turns)
+    response = get_openai().ChatCompletion.create(
+        model=OPENAI_PARAMS["model"],
+        messages=[
+            {"role": "system", "content": "Summarize the conversation in a few short sentences. "
+                                          "Keep names, numbers and decisions."},
+            {"role": "user", "content": f"Earlier summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"}
+        ],
+        max_tokens=150,
+        temperature=0
+    )
+    return response.choices[0].message.content.strip()
+
+# Earlier turns sent with each request, packed into a fixed token budget
+context_builder = ContextBuilder(budget=1200, summary_budget=200, summarizer=summarize_with_openai)
+
+def get_fallback_response(user_input):
+    """Predefined responses used when OpenAI is not available"""
+    start = time.perf_counter()
+    answer = intents.respond(user_input)
+    elapsed = time.perf_counter() - start
+    router.observe("local", elapsed)
+    tracer.record("intent", elapsed)
+    return answer
+
+
+# -------------------- ASYNC RESPONSES --------------------
+async def astream_chatbot_response(user_input, conversation_id=None):
+    """Async twin of stream_chatbot_response for the HTTP service.
+
+    Uses ``openai.ChatCompletion.acreate``; the service installs a shared
+    aiohttp session (``openai.aiosession``) so upstream connections are kept
+    alive between requests.
+    """
+    import asyncio
+    streamed = False
+    flight = None
+    try:
+        if openai_enabled():
+            # Cache lookups, retrieval and summaries can block, so keep them off the event loop
+            while True:
+                request = await asyncio.to_thread(begin_request, user_input, conversation_id)
+                if not isinstance(request, Flight):
+                    break
+                await wait_flight(request)
+            flight, cached, messages = request
+            if cached is not None:
+                yield cached
+                return
+            first, response = await router.acall(lambda timeout: aopen_stream(messages, timeout))
+            parts = []
+            async for chunk in achain(first, response):
+                delta = chunk.choices[0].delta.get("content")
+                if delta:
+                    streamed = True
+                    parts.append(delta)
+                    yield delta
+            if streamed:
+                await asyncio.to_thread(finish_request, flight, user_input, conversation_id, "".join(parts).strip())
+                flight = None
+                return
+    except Exception as e:
+        print(f"OpenAI Error: {e}")
+        if streamed:
+            return
+    finally:
+        abandon_request(flight)
+
+    answer = get_fallback_response(user_input)
+    remember_turn(conversation_id, user_input, answer)
+    yield answer
+
+async def aopen_stream(messages, timeout):
+    response = await get_openai().ChatCompletion.acreate(messages=messages, stream=True, request_timeout=timeout,
+                                                         **OPENAI_PARAMS)
+    try:
+        return [await response.__anext__()], response
+    except StopAsyncIteration:
+        return [], response
+
+async def wait_flight(flight):
+    """Wait for an identical request's upstream call without holding a thread"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    flight.add_done_callback(lambda: loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None)))
+    await done
+
+async def achain(first, rest):
+    for chunk in first:
+        yield chunk
+    async for chunk in rest:
+        yield chunk
+
+# -------------------- SHARED CONVERSATIONS --------------------
+# The HTTP service runs several worker processes and a conversation's requests can
+# land on any of them, so there the messages table is the source of truth for context
+CONTEXT_HISTORY = 200  # newest stored messages loaded into a worker's context
+
+def sync_context(user_id, conversation_id):
+    """Reload a conversation's context from the database if another process added to it"""
+    last_id = message_store.last_id(user_id, conversation_id)
+    if last_id is not None and last_id != context_builder.version(conversation_id):
+        messages, _ = message_store.load_page(user_id, conversation_id, limit=CONTEXT_HISTORY)
+        context_builder.replace(conversation_id, messages, last_id)
+
+def save_turn(user_id, conversation_id, user_input, answer):
+    """Store a question and its answer at once, so the next request sees them whichever process serves it"""
+    last_id = message_store.write(user_id, conversation_id, [("user", user_input), ("assistant", answer)])
+    context_builder.set_version(conversation_id, last_id)
+
+async def aget_chatbot_response(user_input, conversation_id=None):
+    return "".join([delta async for delta in astream_chatbot_response(user_input, conversation_id)]).strip()
@@ -0,0 +1,112 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+# -------------------- MESSAGE STORE --------------------
+class MessageStore:
+    """Conversation history in the ``messages`` table.
+
+    ``add`` only queues the row; a background thread writes queued rows in
+    batches, one transaction per batch, so saving never slows down a send.
+    Pages are read newest first with keyset pagination on (created_at, id).
+    """
+
+    def __init__(self, db, batch_size=200, flush_interval=0.25):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+        self.batches_written = 0
+        self.rows_written = 0
+
+    @staticmethod
+    def new_conversation_id():
+        return uuid.uuid4().hex
+
+    def add(self, user_id, conversation_id, role, content):
+        """Queue a message for the background writer"""
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.write_loop, name="message-writer", daemon=True)
+                self.writer.start()
+                atexit.register(self.flush)
+        self.pending.put((user_id, conversation_id, role, content, time.time()))
+
+    def write_loop(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with self.db.transaction():
+                    self.db.executemany("INSERT INTO messages (user_id, conversation_id, role, content, created_at) "
+                                     "VALUES (?,?,?,?,?)", batch)
+                self.batches_written += 1
+                self.rows_written += len(batch)
+            except sqlite3.Error as err:
+                print(f"History Error: {err}")
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def write(self, user_id, conversation_id, messages):
+        """Write (role, content) messages right away in one transaction; returns the last row id"""
+        now = time.time()
+        with self.db.transaction():
+            self.db.executemany("INSERT INTO messages (user_id, conversation_id, role, content, created_at) "
+                                "VALUES (?,?,?,?,?)",
+                                [(user_id, conversation_id, role, content, now) for role, content in messages])
+            # Read inside the transaction, so no other process's rows can land in between
+            return self.last_id(user_id, conversation_id)
+
+    def last_id(self, user_id, conversation_id):
+        """Row id of the newest stored message of a conversation, or None"""
+        return self.db.execute("SELECT MAX(id) FROM messages WHERE user_id=? AND conversation_id=?",
+                               (user_id, conversation_id)).fetchone()[0]
+
+    def flush(self):
+        """Block until every queued message is written"""
+        if self.writer is not None:
+            self.pending.join()
+
+    def latest_conversation(self, user_id):
+        row = self.db.execute(
+            "SELECT conversation_id FROM messages WHERE user_id=? ORDER BY created_at DESC LIMIT 1",
+            (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_page(self, user_id, conversation_id, before=None, limit=50):
+        """Return (messages, cursor) for the page before ``cursor``, oldest first.
+
+        Messages are (role, content, created_at) tuples. Pass the returned
+        cursor back in to get the previous page; it is None when there is no
+        older history.
+        """
+        if before is None:
+            rows = self.db.execute(
+                "SELECT id, role, content, created_at FROM messages "
+                "WHERE user_id=? AND conversation_id=? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (user_id, conversation_id, limit + 1)).fetchall()
+        else:
+            rows = self.db.execute(
+                "SELECT id, role, content, created_at FROM messages "
+                "WHERE user_id=? AND conversation_id=? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (user_id, conversation_id, before[0], before[1], limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        cursor = (rows[-1][3], rows[-1][0]) if has_more else None
+        return [(role, content, created_at) for _, role, content, created_at in reversed(rows)], cursor
@@ -0,0 +1,123 @@
+import random
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import calculator
+
+# -------------------- INTENT TABLE --------------------
+# Keywords match whole words only. When several intents match, the hit with
+# the longest phrase wins, then the higher priority, then the earliest one.
+Intent = namedtuple("Intent", "name priority keywords response")
+
+JOKES = [
+    "Why don't scientists trust atoms? Because they make up everything! 🤓",
+    "Why did the scarecrow win an award? He was outstanding in his field! 🌾",
+    "Why don't eggs tell jokes? They'd crack each other up! 🥚",
+    "What do you call a fake noodle? An impasta! 🍝"
+]
+
+DEFAULT_RESPONSES = [
+    "That's an interesting question! I'm here to help and learn. 🤔",
+    "I'm not sure I understand completely. Could you rephrase that? 💭",
+    "That's a great question! Let me think about how to best answer that. 🧠",
+    "I'm here to chat and help! Could you tell me more about what you're looking for? 💬",
+    "I'm constantly learning new things. Could you ask me in a different way? 📚"
+]
+
+def current_time(user_input):
+    return f"The current time is {datetime.now().strftime('%I:%M %p')} ⏰"
+
+def current_date(user_input):
+    return f"Today is {datetime.now().strftime('%B %d, %Y')} 📅"
+
+def calculate(user_input):
+    return calculator.answer(user_input) or (
+        "I can help with basic math! Try asking something like 'What is 15 + 27?' or 'Calculate 100 divided by 4'")
+
+def tell_joke(user_input):
+    return random.choice(JOKES)
+
+INTENTS = [
+    Intent("greeting", 110, ["hello", "hi", "hey", "hola"],
+           "Hello! 👋 How can I assist you today?"),
+    Intent("how_are_you", 100, ["how are you", "how do you do"],
+           "I'm doing great! Thanks for asking. I'm here and ready to help you with anything you need! 😊"),
+    Intent("name", 90, ["what is your name", "who are you", "your name"],
+           "I'm your friendly AI chatbot! I'm here to help answer your questions and chat with you! 🤖"),
+    Intent("capabilities", 80, ["what can you do", "help", "capabilities"],
+           "I can help you with:\n• Answering questions\n• Having conversations\n• Providing information\n• Chatting about various topics\nJust ask me anything! 💡"),
+    Intent("time", 70, ["time", "what time", "current time"], current_time),
+    Intent("date", 70, ["date", "today", "what date", "today's date"], current_date),
+    Intent("weather", 60, ["weather", "temperature", "forecast"],
+           "I'd love to give you weather information, but I need access to current weather data. You might want to check a weather app or website for accurate forecasts! ☀️🌧️"),
+    Intent("math", 50, ["calculate", "math", "add", "subtract", "multiply", "divide"], calculate),
+    Intent("goodbye", 40, ["bye", "goodbye", "see you", "exit", "quit"],
+           "Goodbye! 👋 It was nice chatting with you. Feel free to come back anytime!"),
+    Intent("thanks", 30, ["thank", "thanks", "thank you"],
+           "You're welcome! 😊 I'm glad I could help. Is there anything else you'd like to know?"),
+    Intent("joke", 20, ["joke", "jokes", "funny", "make me laugh"], tell_joke),
+]
+
+# -------------------- MATCHER --------------------
+class IntentMatcher:
+    """All intent keywords compiled into one word-level lookup table.
+
+    The input is tokenized once and every token is looked up in a dict of
+    phrases keyed by their first word, so a single pass finds every keyword hit
+    and the cost per message does not grow with the size of the intent table.
+    """
+
+    WORD = re.compile(r"\w+")
+
+    def __init__(self, intents):
+        self.intents = list(intents)
+        self.phrases = {}  # first word -> [(words, keyword, intent)], longest first
+        for intent in self.intents:
+            for keyword in intent.keywords:
+                words = tuple(self.WORD.findall(keyword.lower()))
+                if words:
+                    self.phrases.setdefault(words[0], []).append((words, " ".join(words), intent))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+
+    def hits(self, user_input):
+        """Return (intent, keyword, position) for every keyword found in the input"""
+        words = self.WORD.findall(user_input.lower())
+        found = []
+        for position, word in enumerate(words):
+            for phrase, keyword, intent in self.phrases.get(word, ()):
+                if len(phrase) == 1 or tuple(words[position:position + len(phrase)]) == phrase:
+                    found.append((intent, keyword, position))
+        return found
+
+    def ranked(self, user_input):
+        """Matching intents, best first, each listed once"""
+        best = {}
+        for intent, keyword, position in self.hits(user_input):
+            score = (len(keyword.split()), intent.priority, -position)
+            if intent.name not in best or score > best[intent.name][0]:
+                best[intent.name] = (score, intent)
+        return [intent for score, intent in sorted(best.values(), key=lambda item: item[0], reverse=True)]
+
+    def match(self, user_input):
+        ranked = self.ranked(user_input)
+        return ranked[0] if ranked else None
+
+MATCHER = IntentMatcher(INTENTS)
+
+def respond(user_input):
+    """Answer from the intent table, or with a generic reply if nothing matches"""
+    # Arithmetic answers itself, with or without a math keyword, when the
+    # message is clearly asking for it
+    answer = calculator.answer(user_input, strict=True)
+    if answer is not None:
+        return answer
+    for intent in MATCHER.ranked(user_input):
+        if callable(intent.response):
+            answer = intent.response(user_input)
+            if answer is not None:
+                return answer
+        else:
+            return intent.response
+    return random.choice(DEFAULT_RESPONSES)
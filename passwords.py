@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+# -------------------- PASSWORD HASHERS --------------------
+# Stored formats (algorithm and parameters travel with each hash):
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+#   <salt>$<hash>                        legacy single-round salted SHA-256
+
+def b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+class ScryptHasher:
+    algorithm = "scrypt"
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        self.n, self.r, self.p = n, r, p
+
+    @staticmethod
+    def derive(password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+    def hash(self, password):
+        salt = secrets.token_bytes(16)
+        digest = self.derive(password, salt, self.n, self.r, self.p)
+        return f"scrypt${self.n}${self.r}${self.p}${b64(salt)}${b64(digest)}"
+
+    def params(self):
+        return (self.n, self.r, self.p)
+
+    def harder(self):
+        return ScryptHasher(self.n * 2, self.r, self.p)
+
+class PBKDF2Hasher:
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations=600_000):
+        self.iterations = iterations
+
+    @staticmethod
+    def derive(password, salt, iterations):
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+    def hash(self, password):
+        salt = secrets.token_bytes(16)
+        return f"pbkdf2_sha256${self.iterations}${b64(salt)}${b64(self.derive(password, salt, self.iterations))}"
+
+    def params(self):
+        return (self.iterations,)
+
+    def harder(self):
+        return PBKDF2Hasher(self.iterations * 2)
+
+def verify(password, encoded):
+    """Check a password against any supported stored format"""
+    try:
+        parts = encoded.split("$")
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            digest = ScryptHasher.derive(password, unb64(parts[4]), n, r, p)
+            return hmac.compare_digest(digest, unb64(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = PBKDF2Hasher.derive(password, unb64(parts[2]), int(parts[1]))
+            return hmac.compare_digest(digest, unb64(parts[3]))
+        if len(parts) == 2:
+            salt, stored_password_hash = parts
+            password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+            return hmac.compare_digest(password_hash, stored_password_hash)
+    except (ValueError, TypeError):
+        pass
+    return False
+
+def parse_params(encoded):
+    """Return (algorithm, params) of a stored hash, or (None, None) for legacy hashes"""
+    parts = encoded.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            return "scrypt", (int(parts[1]), int(parts[2]), int(parts[3]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            return "pbkdf2_sha256", (int(parts[1]),)
+    except ValueError:
+        pass
+    return None, None
+
+# -------------------- CALIBRATION --------------------
+def timed_verify(hasher, rounds=3):
+    """Best-of-N seconds for one verify with this hasher on this machine"""
+    encoded = hasher.hash("calibration password")
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        verify("calibration password", encoded)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def calibrate(algorithm="scrypt", target=0.1, floor=None):
+    """Pick the cheapest work factor whose verify takes at least ``target`` seconds.
+
+    Work factors never go below ``floor`` (OWASP minimums by default), so a
+    very fast machine gets at least that and a slow one is not weakened.
+    """
+    if algorithm == "scrypt":
+        hasher = floor or ScryptHasher(n=2 ** 14)
+    else:
+        hasher = floor or PBKDF2Hasher(iterations=600_000)
+    while timed_verify(hasher, rounds=1) < target / 2:
+        hasher = hasher.harder()
+    if algorithm == "pbkdf2_sha256":
+        # Iterations scale linearly, so land close to the target instead of on a power of two
+        elapsed = timed_verify(hasher)
+        if elapsed < target:
+            hasher = PBKDF2Hasher(int(hasher.iterations * target / elapsed))
+    elif timed_verify(hasher) < target * 0.75:
+        hasher = hasher.harder()
+    return hasher
+
+# -------------------- ACTIVE POLICY --------------------
+def cost(algorithm, params):
+    """Relative work of a stored hash's parameters, comparable within one algorithm"""
+    if algorithm == "scrypt":
+        n, r, p = params
+        return n * r * p
+    return params[0]
+
+# Calibration is timing based, so PBKDF2 iteration counts wobble between runs;
+# hashes this close to the current cost are kept instead of rehashed on every restart
+REHASH_SLACK = 0.75
+
+class PasswordPolicy:
+    """The hasher used for new hashes, calibrated in the background at startup"""
+
+    def __init__(self, algorithm="scrypt", target=0.1):
+        self.algorithm = algorithm
+        self.target = target
+        self.hasher = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.started = False
+        self.pid = None
+        self.dummy = None  # (hasher, hash of a random password)
+
+    def start_calibration(self):
+        with self.lock:
+            if self.started and (self.ready.is_set() or self.pid == os.getpid()):
+                return
+            # A process forked mid-calibration inherits started=True but not the
+            # thread doing the work, so the child calibrates for itself
+            self.started = True
+            self.pid = os.getpid()
+        threading.Thread(target=self.run_calibration, name="password-calibration", daemon=True).start()
+
+    def run_calibration(self):
+        try:
+            self.hasher = calibrate(self.algorithm, self.target)
+        except Exception as e:
+            print(f"Password calibration error: {e}")
+            self.hasher = ScryptHasher() if self.algorithm == "scrypt" else PBKDF2Hasher()
+        self.ready.set()
+
+    def current(self):
+        self.start_calibration()
+        self.ready.wait()
+        return self.hasher
+
+    def hash(self, password):
+        return self.current().hash(password)
+
+    def dummy_hash(self):
+        """A hash at the current cost that no password matches, to verify against for unknown users"""
+        hasher = self.current()
+        dummy = self.dummy
+        if dummy is None or dummy[0] is not hasher:
+            dummy = self.dummy = (hasher, hasher.hash(secrets.token_urlsafe(16)))
+        return dummy[1]
+
+    def needs_rehash(self, encoded):
+        """True when a stored hash uses another algorithm or is clearly weaker than the current policy"""
+        hasher = self.current()
+        algorithm, params = parse_params(encoded)
+        if algorithm != hasher.algorithm:
+            return True
+        return cost(algorithm, params) < cost(algorithm, hasher.params()) * REHASH_SLACK
@@ -0,0 +1,181 @@
+"""Latency budget, retries and circuit breaking for the remote (OpenAI) backend.
+
+BackendRouter.call(remote) runs ``remote(timeout)`` with a hard deadline:
+retryable errors are retried with jittered exponential backoff while budget
+remains, and when the budget runs out, the breaker is open or the error is
+final, BackendUnavailable is raised so the caller can answer locally at once.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from tracing import Histogram, tracer
+
+# Exception class names worth another attempt (openai.error.* and builtins), checked by name
+# so this module does not need to import openai
+RETRYABLE = {"Timeout", "TimeoutError", "APIConnectionError", "RateLimitError", "ServiceUnavailableError",
+             "APIError", "TryAgain", "ConnectionError", "ConnectionResetError"}
+
+class BackendUnavailable(Exception):
+    """The remote backend could not answer within the budget; answer locally instead"""
+
+class CircuitOpen(BackendUnavailable):
+    """The breaker is open, so the call was not attempted at all"""
+
+def retryable(error):
+    return any(cls.__name__ in RETRYABLE for cls in type(error).__mro__)
+
+# -------------------- CIRCUIT BREAKER --------------------
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures; let one probe through after ``cooldown`` seconds"""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+            return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips,
+                    "retry_in_s": round(retry_in, 1)}
+
+# -------------------- ROUTER --------------------
+class BackendRouter:
+    def __init__(self, name="openai", budget=8.0, retries=2, backoff=0.25, max_backoff=2.0,
+                 breaker=None, max_workers=16):
+        self.name = name
+        self.budget = budget
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-call")
+        self.histograms = {name: Histogram(), "local": Histogram()}  # always on, unlike the tracer
+        self.counters = {"calls": 0, "ok": 0, "retries": 0, "timeouts": 0, "errors": 0, "short_circuited": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def observe(self, backend, seconds):
+        histogram = self.histograms.get(backend)
+        if histogram is None:
+            histogram = self.histograms.setdefault(backend, Histogram())
+        histogram.record(seconds)
+        if backend == self.name:
+            tracer.record(f"upstream_{backend}", seconds)
+
+    def admit(self):
+        self.count("calls")
+        if not self.breaker.allow():
+            self.count("short_circuited")
+            raise CircuitOpen(f"{self.name} circuit open")
+        return time.monotonic() + self.budget
+
+    def on_error(self, error, attempt, deadline):
+        """Seconds to wait before the next attempt; raises when there should be none"""
+        self.count("errors")
+        if not retryable(error):
+            # The backend answered, it just refused this request (too long, bad key...): not an outage.
+            # Counting it as a success also releases a half-open probe
+            self.breaker.record_success()
+            raise BackendUnavailable(f"{self.name} failed: {error}") from error
+        self.breaker.record_failure()
+        if attempt >= self.retries:
+            raise BackendUnavailable(f"{self.name} failed: {error}") from error
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+        if time.monotonic() + delay >= deadline or not self.breaker.allow():
+            raise BackendUnavailable(f"{self.name} failed: {error}") from error
+        self.count("retries")
+        return delay
+
+    def on_timeout(self):
+        self.count("timeouts")
+        self.breaker.record_failure()
+        return BackendUnavailable(f"{self.name} exceeded {self.budget:.1f} s budget")
+
+    def on_success(self, start):
+        self.count("ok")
+        self.breaker.record_success()
+        self.observe(self.name, time.perf_counter() - start)
+
+    def call(self, remote):
+        """Return ``remote(timeout)`` within the budget, or raise BackendUnavailable"""
+        deadline = self.admit()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            remaining = deadline - time.monotonic()
+            # The worker keeps running after a timeout, but remote() gets ``remaining``
+            # as its own timeout, so it gives up soon after
+            future = self.executor.submit(remote, remaining)
+            try:
+                result = future.result(timeout=remaining)
+            except FutureTimeout:
+                raise self.on_timeout()
+            except Exception as e:
+                time.sleep(self.on_error(e, attempt, deadline))
+                attempt += 1
+                continue
+            self.on_success(start)
+            return result
+
+    async def acall(self, remote):
+        """Async twin of call(): ``await remote(timeout)`` within the budget"""
+        import asyncio
+        deadline = self.admit()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            remaining = deadline - time.monotonic()
+            try:
+                result = await asyncio.wait_for(remote(remaining), remaining)
+            except asyncio.TimeoutError:
+                raise self.on_timeout()
+            except Exception as e:
+                await asyncio.sleep(self.on_error(e, attempt, deadline))
+                attempt += 1
+                continue
+            self.on_success(start)
+            return result
+
+    def get_stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {"budget_s": self.budget, "breaker": self.breaker.snapshot(), **counters,
+                "latency": {name: histogram.snapshot() for name, histogram in self.histograms.items()}}
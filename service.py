@@ -0,0 +1,328 @@
+"""Headless HTTP service for the chatbot engine.
+
+Run: python service.py --port 8080 --workers 4
+
+Endpoints (JSON bodies):
+    POST /register  {fname, lname, email, password, securityQ, securityA}
+    POST /login     {email, password}            -> {user_id, token}
+    POST /chat      {message, conversation_id?, stream?}
+                    with "Authorization: Bearer <token>"; stream=true answers
+                    as server-sent events, one {"delta": ...} per event
+    GET  /health
+    GET  /stats
+    GET  /metrics                                 per-stage latency, Prometheus text
+    GET  /trace                                   per-stage latency, JSON
+
+Stage timings are only collected when CHATBOT_TRACE=1.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import signal
+import time
+
+import aiohttp
+import openai
+
+import engine
+from tracing import tracer
+
+TOKEN_TTL = 12 * 3600
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+               409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+MAX_BODY = 64 * 1024
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# -------------------- TOKENS --------------------
+# Signed tokens need no shared session table, so any worker process can check them
+def make_token(secret, user_id):
+    payload = f"{user_id}.{int(time.time()) + TOKEN_TTL}"
+    signature = hmac.new(secret, payload.encode(), hashlib.sha256).digest()
+    return f"{payload}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"
+
+def check_token(secret, token):
+    """Return the user id for a valid, unexpired token, else None"""
+    try:
+        user_id, expires, signature = token.split(".")
+        expected = hmac.new(secret, f"{user_id}.{expires}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(base64.urlsafe_b64encode(expected).decode().rstrip("="), signature):
+            return None
+        if int(expires) < time.time():
+            return None
+        return int(user_id)
+    except ValueError:
+        return None
+
+# -------------------- PER-USER LIMIT --------------------
+class ActiveRequests:
+    """Chat requests in flight per user, shared by every worker process.
+
+    Counters live in shared memory, one slot per user id modulo ``slots``, so
+    the limit holds whichever worker a request lands on. Create it before the
+    workers start. Users that share a slot also share the limit.
+    """
+
+    def __init__(self, slots=65536):
+        self.counts = multiprocessing.Array("i", slots)
+
+    def acquire(self, user_id, limit):
+        slot = user_id % len(self.counts)
+        with self.counts.get_lock():
+            if self.counts[slot] >= limit:
+                return False
+            self.counts[slot] += 1
+            return True
+
+    def release(self, user_id):
+        slot = user_id % len(self.counts)
+        with self.counts.get_lock():
+            self.counts[slot] -= 1
+
+    def users(self):
+        with self.counts.get_lock():
+            return sum(1 for count in self.counts if count)
+
+# -------------------- SERVICE --------------------
+class ChatService:
+    def __init__(self, secret, per_user_limit=2, active=None):
+        self.secret = secret
+        self.per_user_limit = per_user_limit
+        self.active = active or ActiveRequests()
+        self.started = time.time()
+        self.requests = 0
+        self.rejected = 0
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive connection"""
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.requests += 1
+                try:
+                    await self.route(writer, method, path, headers, body, keep_alive)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except Exception as e:
+                    print(f"Service Error: {e}")
+                    await self.send_json(writer, 500, {"error": "internal error"}, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "bad request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY:
+            raise HTTPError(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    async def route(self, writer, method, path, headers, body, keep_alive):
+        if method == "GET" and path == "/health":
+            await self.send_json(writer, 200, {"status": "ok"}, keep_alive)
+        elif method == "GET" and path == "/stats":
+            await self.send_json(writer, 200, self.stats(), keep_alive)
+        elif method == "GET" and path == "/metrics":
+            await self.send_text(writer, 200, tracer.prometheus(), keep_alive)
+        elif method == "GET" and path == "/trace":
+            await self.send_json(writer, 200, {"enabled": tracer.enabled, "stages": tracer.snapshot()}, keep_alive)
+        elif method == "POST" and path == "/register":
+            await self.register(writer, self.parse_json(body), keep_alive)
+        elif method == "POST" and path == "/login":
+            await self.login(writer, self.parse_json(body), keep_alive)
+        elif method == "POST" and path == "/chat":
+            await self.chat(writer, headers, self.parse_json(body), keep_alive)
+        else:
+            raise HTTPError(404, "not found")
+
+    @staticmethod
+    def parse_json(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "invalid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return data
+
+    async def register(self, writer, data, keep_alive):
+        fields = [str(data.get(name, "")) for name in ("fname", "lname", "email", "password", "securityQ", "securityA")]
+        try:
+            # SQLite and password hashing block, so they run on the default thread pool
+            user_id = await asyncio.to_thread(engine.register_user, *fields)
+        except engine.AuthError as e:
+            raise HTTPError(409 if "exists" in str(e) else 400, str(e))
+        await self.send_json(writer, 200, {"user_id": user_id}, keep_alive)
+
+    async def login(self, writer, data, keep_alive):
+        row = await asyncio.to_thread(engine.authenticate, str(data.get("email", "")), str(data.get("password", "")))
+        if not row:
+            raise HTTPError(401, "Invalid Username or Password")
+        await self.send_json(writer, 200, {"user_id": row[0], "token": make_token(self.secret, row[0])}, keep_alive)
+
+    async def chat(self, writer, headers, data, keep_alive):
+        auth = headers.get("authorization", "")
+        user_id = check_token(self.secret, auth[7:]) if auth.startswith("Bearer ") else None
+        if user_id is None:
+            raise HTTPError(401, "missing or invalid token")
+        message = str(data.get("message", "")).strip()
+        if not message:
+            raise HTTPError(400, "Please enter a valid input.")
+        if not self.active.acquire(user_id, self.per_user_limit):
+            self.rejected += 1
+            raise HTTPError(429, "too many requests in flight for this user")
+
+        conversation_id = data.get("conversation_id")
+        conversation_id = f"{user_id}:{conversation_id}" if conversation_id else None
+        try:
+            if conversation_id is not None:
+                # Earlier turns may have been answered by another worker
+                await asyncio.to_thread(engine.sync_context, user_id, conversation_id)
+            parts = []
+            deltas = self.collect(engine.astream_chatbot_response(message, conversation_id), parts)
+            if data.get("stream"):
+                await self.send_stream(writer, deltas, keep_alive)
+            else:
+                async for _ in deltas:
+                    pass
+            answer = "".join(parts).strip()
+            if conversation_id is not None:
+                await asyncio.to_thread(engine.save_turn, user_id, conversation_id, message, answer)
+            if not data.get("stream"):
+                await self.send_json(writer, 200, {"response": answer}, keep_alive)
+        finally:
+            self.active.release(user_id)
+
+    @staticmethod
+    async def collect(deltas, parts):
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+
+    def stats(self):
+        return {"pid": os.getpid(), "uptime": time.time() - self.started, "requests": self.requests,
+                "rejected": self.rejected, "active_users": self.active.users(),
+                "cache": engine.response_cache.get_stats(), "context": engine.context_builder.get_stats(),
+                "router": engine.router.get_stats()}
+
+    @staticmethod
+    async def send_json(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    @staticmethod
+    async def send_text(writer, status, text, keep_alive):
+        body = text.encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                     f"Content-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    @staticmethod
+    async def send_stream(writer, deltas, keep_alive):
+        """Server-sent events over chunked transfer encoding"""
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     f"Transfer-Encoding: chunked\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode())
+        async for delta in deltas:
+            event = f"data: {json.dumps({'delta': delta})}\n\n".encode()
+            writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+            await writer.drain()
+        done = b"data: [DONE]\n\n"
+        writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(done), done))
+        await writer.drain()
+
+# -------------------- WORKERS --------------------
+async def serve(host, port, secret, per_user_limit, active, reuse_port):
+    service = ChatService(secret, per_user_limit, active)
+    # One pooled aiohttp session per worker keeps upstream connections alive
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60))
+    openai.aiosession.set(session)
+    server = await asyncio.start_server(service.handle_connection, host, port, reuse_port=reuse_port,
+                                        limit=MAX_BODY)
+    print(f"Worker {os.getpid()} listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await session.close()
+
+def run_worker(host, port, secret, per_user_limit, active, reuse_port):
+    try:
+        asyncio.run(serve(host, port, secret, per_user_limit, active, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatbot HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--per-user-limit", type=int, default=2, help="concurrent chat requests per user")
+    args = parser.parse_args()
+
+    secret = os.getenv("CHATBOT_SECRET", "").encode() or secrets.token_bytes(32)
+    engine.setup_database()  # apply migrations once, before the workers start
+    engine.password_policy.current()  # calibrate once here; forked workers inherit the result
+    engine.db.close_all()    # workers open their own connections
+    active = ActiveRequests()  # shared by the workers, so the per-user limit is service-wide
+    if args.workers <= 1:
+        run_worker(args.host, args.port, secret, args.per_user_limit, active, False)
+        return
+
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(args.host, args.port, secret, args.per_user_limit, active, True))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    # Treat SIGTERM like Ctrl+C so the workers are stopped too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+if __name__ == "__main__":
+    main()
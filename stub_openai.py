@@ -0,0 +1,163 @@
+"""Local stand-in for the OpenAI chat completions API, for offline load tests.
+
+Run: python stub_openai.py --port 8081 --latency 200 --tokens 40 --token-delay 5
+Then point the chatbot at it:
+    OPENAI_API_BASE=http://127.0.0.1:8081/v1 OPENAI_API_KEY=stub python service.py
+
+Answers POST /v1/chat/completions with a canned reply of ``--tokens`` words,
+as plain JSON or, with "stream": true, as server-sent event chunks.
+
+Fault injection, for exercising retries, deadlines and the circuit breaker:
+    --error-rate 0.1 --error-status 503   fail this fraction of requests
+    --hang-rate 0.05 --hang 30            never answer some requests (for 30 s)
+    --slow-rate 0.1 --slow-latency 3000   add a long tail
+    --outage 10:20                        fail everything from 10 s to 30 s after start
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+ERROR_TYPES = {429: "rate_limit_exceeded", 500: "server_error", 502: "server_error", 503: "server_error"}
+
+class StubOpenAI:
+    def __init__(self, latency=0.2, tokens=40, token_delay=0.005, error_rate=0.0, error_status=503,
+                 hang_rate=0.0, hang=30.0, slow_rate=0.0, slow_latency=3.0, outage=None, seed=None):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.outage = outage  # (start, duration) in seconds after launch
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.faults = {"errors": 0, "hangs": 0, "slow": 0}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+                self.requests += 1
+                await self.respond(writer, json.loads(body or b"{}"))
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def words(self, request):
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        return [f"stub{i}" for i in range(self.tokens - 1)] + [f"({len(prompt)} chars)"]
+
+    def in_outage(self):
+        if self.outage is None:
+            return False
+        start, duration = self.outage
+        return start <= time.monotonic() - self.started < start + duration
+
+    async def respond(self, writer, request):
+        roll = self.rng.random()
+        if self.in_outage() or roll < self.error_rate:
+            self.faults["errors"] += 1
+            await asyncio.sleep(self.latency / 4)
+            return await self.send_error(writer, self.error_status)
+        roll -= self.error_rate
+        if roll < self.hang_rate:
+            self.faults["hangs"] += 1
+            await asyncio.sleep(self.hang)
+        elif roll < self.hang_rate + self.slow_rate:
+            self.faults["slow"] += 1
+            await asyncio.sleep(self.slow_latency)
+        await asyncio.sleep(self.latency)
+        words = self.words(request)
+        created = int(time.time())
+        if not request.get("stream"):
+            body = json.dumps({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created,
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            }).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for i, word in enumerate(words):
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+                     "model": request.get("model", "stub"),
+                     "choices": [{"index": 0, "finish_reason": None,
+                                  "delta": {"content": word if i == 0 else f" {word}"}}]}
+            self.write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        self.write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def send_error(writer, status):
+        body = json.dumps({"error": {"message": f"injected fault ({status})",
+                                     "type": ERROR_TYPES.get(status, "server_error")}}).encode()
+        writer.write(b"HTTP/1.1 %d Injected Fault\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (status, len(body), body))
+        await writer.drain()
+
+    @staticmethod
+    def write_chunk(writer, data):
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+async def serve(host, port, stub):
+    server = await asyncio.start_server(stub.handle_connection, host, port)
+    print(f"Stub OpenAI listening on http://{host}:{port}/v1")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI chat completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=200, help="ms before the first byte")
+    parser.add_argument("--tokens", type=int, default=40, help="words per reply")
+    parser.add_argument("--token-delay", type=float, default=5, help="ms between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that stall")
+    parser.add_argument("--hang", type=float, default=30, help="seconds a stalled request waits")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests with extra latency")
+    parser.add_argument("--slow-latency", type=float, default=3000, help="ms added to slow requests")
+    parser.add_argument("--outage", help="START:DURATION in seconds after launch during which every request fails")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible faults")
+    args = parser.parse_args()
+    outage = tuple(float(part) for part in args.outage.split(":")) if args.outage else None
+    stub = StubOpenAI(args.latency / 1000, args.tokens, args.token_delay / 1000,
+                      error_rate=args.error_rate, error_status=args.error_status,
+                      hang_rate=args.hang_rate, hang=args.hang, slow_rate=args.slow_rate,
+                      slow_latency=args.slow_latency / 1000, outage=outage, seed=args.seed)
+    try:
+        asyncio.run(serve(args.host, args.port, stub))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
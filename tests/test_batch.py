@@ -0,0 +1,163 @@
+"""Batch mode: ordered output, checkpoint resume and upstream retries.
+
+Run: python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import batch
+import engine
+from cache import ResponseCache
+from db import ConnectionManager
+from router import BackendUnavailable
+
+class Crash(Exception):
+    pass
+
+class EchoRunner(batch.BatchRunner):
+    """Answers each prompt with itself; raises Crash on ``crash_at`` to simulate the process dying"""
+
+    def __init__(self, crash_at=None):
+        super().__init__(rate=0)
+        self.crash_at = crash_at
+        self.seen = []
+
+    def process(self, line_no, line):
+        if line_no == self.crash_at:
+            raise Crash(line_no)
+        self.seen.append(line_no)
+        return {"line": line_no, "response": json.loads(line)["prompt"].upper()}
+
+def write_input(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": i, "prompt": f"prompt {i}"}) + "\n")
+            if i % 7 == 3:
+                f.write("\n")  # blank lines are skipped, not counted
+
+def read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.fixture
+def paths(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(source, 50)
+    return str(source), str(output)
+
+# -------------------- RUN AND RESUME --------------------
+def test_output_is_in_input_order(paths):
+    source, output = paths
+    summary = EchoRunner().run(source, output, concurrency=4, checkpoint_every=10)
+    records = read_output(output)
+    assert [r["line"] for r in records] == list(range(1, 51))
+    assert records[7]["response"] == "PROMPT 7"
+    assert summary["lines"] == 50 and summary["ok"] == 50
+
+def test_resume_after_crash_writes_every_line_once(paths):
+    source, output = paths
+    with pytest.raises(Crash):
+        EchoRunner(crash_at=27).run(source, output, concurrency=4, checkpoint_every=10)
+    with open(f"{output}.ckpt") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["lines_done"] == 20
+
+    rerun = EchoRunner()
+    summary = rerun.run(source, output, concurrency=4, checkpoint_every=10)
+    assert min(rerun.seen) == 21  # lines before the checkpoint are not redone
+    assert [r["line"] for r in read_output(output)] == list(range(1, 51))
+    assert summary["this_run"] == 30 and summary["lines"] == 50
+
+def test_output_past_the_checkpoint_is_truncated(paths):
+    source, output = paths
+    with pytest.raises(Crash):
+        EchoRunner(crash_at=15).run(source, output, concurrency=1, checkpoint_every=10)
+    with open(output, "a") as f:
+        f.write('{"line": 11, "response": "half written')  # what a crash mid-write leaves
+    EchoRunner().run(source, output, concurrency=2, checkpoint_every=10)
+    assert [r["line"] for r in read_output(output)] == list(range(1, 51))
+
+def test_output_shorter_than_checkpoint_refuses_to_resume(paths):
+    source, output = paths
+    with pytest.raises(Crash):
+        EchoRunner(crash_at=25).run(source, output, concurrency=1, checkpoint_every=10)
+    with open(output, "r+") as f:
+        f.truncate(10)
+    with pytest.raises(SystemExit):
+        EchoRunner().run(source, output)
+
+# -------------------- UPSTREAM CALLS --------------------
+class InvalidRequestError(Exception):
+    pass
+
+class RateLimitError(Exception):
+    pass
+
+class Upstream:
+    """Stands in for engine.ask_openai: pops an outcome from ``script`` per call, "answer" once it is empty"""
+
+    def __init__(self):
+        self.calls = []
+        self.script = []
+
+    def __call__(self, prompt, conversation_id=None, timeout=None, semantic=True):
+        assert not semantic  # batch must not grow the semantic cache
+        self.calls.append(prompt)
+        outcome = self.script.pop(0) if self.script else "answer"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = Upstream()
+    monkeypatch.setattr(engine, "ask_openai", fake)
+    return fake
+
+def make_runner(retries=3):
+    return batch.BatchRunner(rate=0, retries=retries, backoff=0.001)
+
+def test_retryable_errors_are_retried_once_per_attempt(upstream):
+    upstream.script.extend([RateLimitError("slow down")] * 2)
+    assert make_runner().call_upstream("p") == "answer"
+    assert len(upstream.calls) == 3
+
+def test_retries_stop_after_the_limit(upstream):
+    upstream.script.extend([RateLimitError("slow down")] * 10)
+    with pytest.raises(BackendUnavailable):
+        make_runner(retries=3).call_upstream("p")
+    assert len(upstream.calls) == 4  # no hidden retries inside the router
+
+def test_bad_requests_are_not_retried(upstream):
+    upstream.script.append(InvalidRequestError("context too long"))
+    with pytest.raises(BackendUnavailable):
+        make_runner().call_upstream("p")
+    assert len(upstream.calls) == 1
+
+def test_open_circuit_waits_instead_of_failing_the_row(upstream):
+    runner = make_runner()
+    runner.router.breaker.cooldown = 0.05
+    for _ in range(runner.router.breaker.threshold):
+        runner.router.breaker.record_failure()
+    assert runner.router.breaker.snapshot()["state"] == "open"
+    assert runner.call_upstream("p") == "answer"
+    assert runner.router.breaker.snapshot()["state"] == "closed"
+
+def test_process_records_errors_and_ids(upstream, monkeypatch, tmp_path):
+    db = ConnectionManager(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(engine, "response_cache", ResponseCache(db))
+    monkeypatch.setattr(engine, "openai_enabled", lambda: True)
+    runner = make_runner()
+    assert runner.process(1, json.dumps({"id": "a", "prompt": "hello"}))["response"] == "answer"
+    assert runner.process(2, json.dumps({"id": "b", "prompt": "hello"}))["response"] == "answer"
+    assert len(upstream.calls) == 1  # the repeat came from the response cache
+    record = runner.process(3, json.dumps({"id": "c"}))
+    assert record["id"] == "c" and "missing 'prompt'" in record["error"]
+    assert "error" in runner.process(4, "not json")
+    db.close_all()
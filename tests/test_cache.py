@@ -0,0 +1,132 @@
+"""Response cache: the two tiers, expiry and single-flight.
+
+Run: python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache import ResponseCache
+from db import ConnectionManager
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "cache.db"))
+    yield manager
+    manager.close_all()
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+# -------------------- TIERS --------------------
+def test_put_then_get_from_memory(db):
+    cache = ResponseCache(db)
+    cache.put("k", "answer", 0.5)
+    assert cache.get("k") == "answer"
+    assert cache.get_stats()["memory_hits"] == 1
+
+def test_survives_restart_on_disk(db):
+    ResponseCache(db).put("k", "answer")
+    cache = ResponseCache(db)
+    assert cache.get("k") == "answer"
+    assert cache.get("k") == "answer"
+    stats = cache.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+def test_expired_entries_are_misses(db):
+    cache = ResponseCache(db, ttl=0.05)
+    cache.put("k", "answer")
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert ResponseCache(db, ttl=0.05).get("k") is None
+    assert db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] == 0
+
+def test_disk_rows_are_trimmed_to_max_rows(db):
+    cache = ResponseCache(db, max_memory=10, max_rows=50)
+    for i in range(200):
+        cache.put(f"k{i}", f"v{i}")
+    assert db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] <= 50
+    assert cache.get("k199") == "v199"
+
+def test_normalized_prompts_share_a_key():
+    cache = ResponseCache(None)
+    assert cache.make_key("What is  Python?", {}) == cache.make_key("what is python", {})
+    assert cache.make_key("what is python", {"model": "a"}) != cache.make_key("what is python", {"model": "b"})
+
+# -------------------- SINGLE-FLIGHT --------------------
+def test_concurrent_identical_prompts_call_upstream_once(db):
+    cache = ResponseCache(db)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("prompt", {}, compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.get_stats()["coalesced"] == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["answer"] * 8
+    assert len(calls) == 1
+    assert cache.get(cache.make_key("prompt", {})) == "answer"
+
+def test_leader_error_reaches_waiters_and_is_not_cached(db):
+    cache = ResponseCache(db)
+    key = cache.make_key("prompt", {})
+    _, flight, leader = cache.join(key)
+    _, same, follower_leads = cache.join(key)
+    assert leader and same is flight and not follower_leads
+
+    cache.complete(flight, error=RuntimeError("upstream down"))
+    with pytest.raises(RuntimeError, match="upstream down"):
+        same.wait()
+    assert cache.get(key) is None
+    assert cache.get_or_compute("prompt", {}, lambda: "second try") == "second try"
+
+def test_waiter_takes_over_when_leader_gives_up(db):
+    cache = ResponseCache(db)
+    key = cache.make_key("prompt", {})
+    _, flight, _ = cache.join(key)
+    _, waiting, leads = cache.join(key)
+    assert not leads
+
+    cache.complete(flight, error=RuntimeError("upstream call abandoned"))
+    waiting.event.wait(1)
+    # The next join after an abandoned flight leads a fresh call instead of waiting forever
+    _, retry, leads = cache.join(key)
+    assert leads and retry is not flight
+    cache.complete(retry, "answer")
+    assert cache.join(key) == ("answer", None, False)
+
+def test_complete_twice_keeps_the_first_result(db):
+    cache = ResponseCache(db)
+    _, flight, _ = cache.join("k")
+    cache.complete(flight, "first")
+    cache.complete(flight, error=RuntimeError("late"))
+    assert flight.wait() == "first"
+    assert cache.get("k") == "first"
+
+def test_done_callback_runs_once_on_completion(db):
+    cache = ResponseCache(db)
+    _, flight, _ = cache.join("k")
+    seen = []
+    flight.add_done_callback(lambda: seen.append("before"))
+    cache.complete(flight, "answer")
+    flight.add_done_callback(lambda: seen.append("after"))
+    assert seen == ["before", "after"]
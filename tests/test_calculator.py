@@ -0,0 +1,98 @@
+"""Behaviour of the safe calculator and when chat messages are answered with it.
+
+Run: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calculator
+import intents
+
+# -------------------- EVALUATION --------------------
+@pytest.mark.parametrize("expression, expected", [
+    ("15 + 27", 42),
+    ("(2 + 3) * 4", 20),
+    ("7 // 2", 3),
+    ("7 % 4", 3),
+    ("2 ** 10", 1024),
+    ("-3 + 5", 2),
+    ("1 / 4", 0.25),
+])
+def test_evaluate(expression, expected):
+    assert calculator.evaluate(expression) == expected
+
+@pytest.mark.parametrize("message, expected", [
+    ("What is 15 + 27?", "42"),
+    ("Calculate 100 divided by 4", "25"),
+    ("3 times 4", "12"),
+    ("5 squared", "25"),
+    ("2 to the power of 8", "256"),
+    ("1,000 + 1", "1001"),
+])
+def test_answer_understands_operator_words(message, expected):
+    assert calculator.answer(message) == f"The answer is: {expected} 🧮"
+
+# -------------------- SAFETY LIMITS --------------------
+@pytest.mark.parametrize("expression, reason", [
+    ("9**9**9", "exponent too large"),
+    ("2 ** 1001", "exponent too large"),
+    ("10 ** 99 * 10 ** 99", "result too large"),
+    ("9 ** 200", "result too large"),
+    ("1" + "0" * 101 + " + 1", "number too large"),
+    ("1 / 0", "division by zero"),
+    ("0 ** -1", "division by zero"),
+    ("1 + " * 60 + "1", "expression too long"),
+])
+def test_refused(expression, reason):
+    with pytest.raises(calculator.CalcError, match=reason):
+        calculator.evaluate(expression)
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "(1).__class__",
+    "abs(-1)",
+    "x + 1",
+    "[1, 2]",
+    "'a' * 3",
+])
+def test_only_arithmetic_is_allowed(expression):
+    with pytest.raises(calculator.CalcError):
+        calculator.evaluate(expression)
+
+def test_huge_power_is_answered_as_refusal():
+    assert calculator.answer("9**9**9") == "I can't calculate that: exponent too large. 🧮"
+
+# -------------------- CHAT GATING --------------------
+@pytest.mark.parametrize("message", [
+    "call me at 555-1234",
+    "I am 25 - 30 years old",
+    "my order 12-3 arrived",
+    "see you on 2024-10-17",
+])
+def test_numbers_in_passing_are_not_calculated(message):
+    assert "🧮" not in intents.respond(message)
+
+@pytest.mark.parametrize("message, expected", [
+    ("15 + 27", "42"),
+    ("what's 6 * 7", "42"),
+    ("how much is 50 minus 8", "42"),
+    ("(40 + 2)", "42"),
+    ("84 / 2?", "42"),
+])
+def test_arithmetic_questions_are_calculated(message, expected):
+    assert intents.respond(message) == f"The answer is: {expected} 🧮"
+
+def test_math_keyword_still_calculates():
+    assert intents.respond("math 555-1234") == "The answer is: -679 🧮"
+
+def test_evaluate_many_matches_evaluate():
+    expressions = ["1 + 2", "3 * 4", "2 ** 0.5", "9**9**9", "1 / 0", "nope"]
+    results = calculator.evaluate_many(expressions)
+    assert results[:2] == [3.0, 12.0]
+    assert results[2] == pytest.approx(2 ** 0.5)
+    assert results[3:] == [None, None, None]
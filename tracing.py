@@ -0,0 +1,209 @@
+"""Lightweight tracing: per-stage timings in fixed-size HDR-style histograms.
+
+    with tracer.span("db"):
+        ...
+    tracer.record("upstream_openai", seconds)
+
+Tracing is off unless CHATBOT_TRACE=1 or tracer.enable() is called; while
+off, span() returns a shared no-op context manager and record() returns at
+once. Histograms export as JSON (snapshot()) or Prometheus text
+(prometheus()). cProfile and tracemalloc captures can be started and
+stopped on demand.
+"""
+import io
+import os
+import threading
+import time
+
+# -------------------- HISTOGRAM --------------------
+class Histogram:
+    """Log-linear buckets over microseconds, HDR style: fixed memory, ~1.6% relative error.
+
+    Values below 2**SUB_BITS us get exact buckets; above that every power of
+    two is split into 2**(SUB_BITS-1) linear sub-buckets. Updates take no
+    lock, so concurrent threads can very rarely lose a count.
+    """
+
+    SUB_BITS = 7
+    MAX_SHIFT = 33  # ~2**40 us, about 12 days
+    SIZE = (1 << SUB_BITS) + MAX_SHIFT * (1 << (SUB_BITS - 1))
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.SIZE
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def index(cls, micros):
+        if micros < (1 << cls.SUB_BITS):
+            return micros
+        shift = min(micros.bit_length() - cls.SUB_BITS, cls.MAX_SHIFT)
+        top = min(micros >> shift, (1 << cls.SUB_BITS) - 1)
+        return (1 << cls.SUB_BITS) + (shift - 1) * (1 << (cls.SUB_BITS - 1)) + top - (1 << (cls.SUB_BITS - 1))
+
+    @classmethod
+    def upper_bound(cls, index):
+        """Largest value in microseconds that lands in this bucket"""
+        if index < (1 << cls.SUB_BITS):
+            return index
+        half = 1 << (cls.SUB_BITS - 1)
+        shift, offset = divmod(index - (1 << cls.SUB_BITS), half)
+        shift += 1
+        return ((offset + half + 1) << shift) - 1
+
+    def record(self, seconds):
+        micros = int(seconds * 1_000_000)
+        self.counts[self.index(micros if micros > 0 else 0)] += 1
+        self.total += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Seconds at or below which ``p`` percent of recorded values fall, or None"""
+        if not self.total:
+            return None
+        rank = max(1, p / 100 * self.total)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(i) / 1_000_000, self.max)
+        return self.max
+
+    def snapshot(self):
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+        return {"count": self.total, "mean_ms": ms(self.sum / self.total if self.total else None),
+                "p50_ms": ms(self.percentile(50)), "p95_ms": ms(self.percentile(95)),
+                "p99_ms": ms(self.percentile(99)), "max_ms": ms(self.max if self.total else None)}
+
+# -------------------- TRACER --------------------
+class Span:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}  # stage -> Histogram
+        self.lock = threading.Lock()
+        self.profiler = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def span(self, stage):
+        """Context manager timing one stage; free when tracing is off"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self.histogram(stage))
+
+    def record(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    # -------------------- EXPORT --------------------
+    def snapshot(self):
+        """Per-stage count, mean, p50/p95/p99 and max in milliseconds"""
+        with self.lock:
+            stages = sorted(self.histograms.items())
+        return {stage: histogram.snapshot() for stage, histogram in stages}
+
+    def prometheus(self, metric="chatbot_stage_seconds"):
+        """Prometheus text exposition format, one summary per stage"""
+        with self.lock:
+            stages = sorted(self.histograms.items())
+        lines = [f"# HELP {metric} Time spent per stage.", f"# TYPE {metric} summary"]
+        for stage, histogram in stages:
+            for quantile in (0.5, 0.95, 0.99):
+                value = histogram.percentile(quantile * 100)
+                lines.append(f'{metric}{{stage="{stage}",quantile="{quantile}"}} {value or 0:.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.total}')
+        return "\n".join(lines) + "\n"
+
+    # -------------------- PROFILING --------------------
+    def start_profile(self):
+        """Start cProfile on the calling thread"""
+        import cProfile
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profile(self, limit=30, path=None):
+        """Stop cProfile and return the top functions by cumulative time (also written to ``path``)"""
+        import pstats
+        if self.profiler is None:
+            return ""
+        self.profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        self.profiler = None
+        return self.write_report(out.getvalue(), path)
+
+    @staticmethod
+    def start_memory_tracking(frames=1):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def memory_report(self, limit=20, path=None, stop=True):
+        """Top allocation sites since start_memory_tracking()"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return ""
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+        if stop:
+            tracemalloc.stop()
+        report = "\n".join([f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB"] + [str(stat) for stat in top])
+        return self.write_report(report + "\n", path)
+
+    @staticmethod
+    def write_report(report, path):
+        if path:
+            with open(path, "w") as f:
+                f.write(report)
+        return report
+
+tracer = Tracer(enabled=os.getenv("CHATBOT_TRACE") == "1")
@@ -0,0 +1,325 @@
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, one writer process assumed
+    fcntl = None
+
+# -------------------- EMBEDDINGS --------------------
+class HashingEmbedder:
+    """Offline text embeddings from hashed word and character n-gram features.
+
+    Needs no model download or network access. Similar wording gives similar
+    vectors, which is enough for near-duplicate detection and keyword-ish
+    retrieval. Operators and symbols are tokens too, so "15 + 27" and
+    "15 * 27" do not embed the same. Vectors are L2-normalized so a dot
+    product is the cosine.
+    """
+
+    SYMBOLS = "-+*/^%=<>&|~$€£#@"
+    TOKEN = re.compile(r"\w+|[" + re.escape(SYMBOLS) + "]")
+
+    def __init__(self, dim=256, char_ngrams=(3, 4)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+
+    def features(self, text):
+        tokens = self.TOKEN.findall(text.lower())
+        features = list(tokens)
+        features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        for word in tokens:
+            if word in self.SYMBOLS:
+                continue
+            padded = f" {word} "
+            for n in self.char_ngrams:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, texts):
+        """Return a (len(texts), dim) float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                h = zlib.crc32(feature.encode())
+                # The top hash bit picks the sign so collisions tend to cancel out
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+# -------------------- VECTOR STORE --------------------
+class VectorStore:
+    """Append-only vector index on disk.
+
+    Vectors live in ``<path>.f32``, a memory-mapped float32 matrix that doubles
+    in capacity as it fills. ``<path>.jsonl`` holds one ``{"text", "payload"}``
+    line per row; a row only counts once its sidecar line is written. Search is
+    a batched matrix product over all rows, or an IVF (inverted file) search
+    over the nearest partitions once the store is larger than ``ivf_threshold``.
+
+    Several processes can share a store: writers take an exclusive lock on the
+    sidecar and pick up rows other processes added before appending, and
+    searches pick them up too.
+    """
+
+    def __init__(self, path, embedder=None, ivf_threshold=200_000, nprobe=8):
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.lock = threading.RLock()
+        self.offsets = []  # row -> byte offset of its sidecar line
+        self.ivf = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.end = 0       # byte offset just past the last complete sidecar line
+        self.sidecar = open(f"{path}.jsonl", "ab+")
+        self.matrix = None
+        self.capacity = 0
+        self.refresh()
+        self.reserve(max(len(self.offsets), 1024))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def refresh(self):
+        """Pick up rows other processes appended since the last look (called with self.lock held)"""
+        if os.fstat(self.sidecar.fileno()).st_size <= self.end:
+            return
+        self.sidecar.seek(self.end)
+        for line in self.sidecar:
+            if not line.endswith(b"\n"):
+                break  # still being written
+            self.offsets.append(self.end)
+            self.end += len(line)
+        self.reserve(len(self.offsets))
+
+    @contextmanager
+    def file_lock(self):
+        """Exclusive lock on the store across processes"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.sidecar.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.sidecar.fileno(), fcntl.LOCK_UN)
+
+    def reserve(self, rows):
+        """Grow the matrix file so it holds at least ``rows`` vectors"""
+        if rows <= self.capacity:
+            return
+        matrix_path = f"{self.path}.f32"
+        row_bytes = self.dim * 4
+        size = os.path.getsize(matrix_path) if os.path.exists(matrix_path) else 0
+        # Another process may have grown the file already; never shrink it
+        capacity = max(self.capacity, size // row_bytes, 1024)
+        while capacity < rows:
+            capacity *= 2
+        if capacity * row_bytes > size:
+            with open(matrix_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if self.matrix is not None:
+            self.matrix.flush()
+        self.matrix = np.memmap(matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def add(self, texts, payloads=None):
+        """Embed and store texts; returns their row ids"""
+        return self.add_vectors(self.embedder.embed(texts), texts, payloads)
+
+    def add_vectors(self, vectors, texts, payloads=None):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        payloads = payloads if payloads is not None else [None] * len(texts)
+        with self.lock, self.file_lock():
+            # Rows from other processes first, so this batch goes after them
+            self.refresh()
+            if os.fstat(self.sidecar.fileno()).st_size > self.end:
+                self.sidecar.truncate(self.end)  # a line left half-written by a crashed writer
+            start = len(self.offsets)
+            self.reserve(start + len(texts))
+            self.matrix[start:start + len(texts)] = vectors
+            self.matrix.flush()
+            lines = []
+            for text, payload in zip(texts, payloads):
+                line = (json.dumps({"text": text, "payload": payload}) + "\n").encode()
+                lines.append(line)
+                self.offsets.append(self.end)
+                self.end += len(line)
+            self.sidecar.write(b"".join(lines))
+            self.sidecar.flush()
+            return list(range(start, start + len(texts)))
+
+    def get(self, row):
+        """Return (text, payload) for a row id"""
+        with self.lock:
+            self.sidecar.seek(self.offsets[row])
+            entry = json.loads(self.sidecar.readline())
+        return entry["text"], entry["payload"]
+
+    def search(self, queries, k=5):
+        """Top-k (row, score) lists for each query text"""
+        return self.search_vectors(self.embedder.embed(queries), k)
+
+    def search_vectors(self, queries, k=5):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self.lock:
+            self.refresh()
+            count = len(self.offsets)
+            if count == 0:
+                return [[] for _ in queries]
+            if count >= self.ivf_threshold:
+                if self.ivf is None or count - self.ivf["count"] > self.ivf["count"] // 10:
+                    self.build_ivf()
+                return [self.search_ivf(query, k, count) for query in queries]
+            return self.search_exact(queries, k, 0, count)
+
+    def search_exact(self, queries, k, start, stop, chunk=262_144):
+        """Brute-force cosine search over rows [start, stop) in chunks"""
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for lo in range(start, stop, chunk):
+            hi = min(lo + chunk, stop)
+            scores = queries @ self.matrix[lo:hi].T
+            top = min(k, hi - lo)
+            idx = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_rows = np.concatenate([best_rows, idx + lo], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, idx, axis=1)], axis=1)
+        order = np.argsort(-best_scores, axis=1)[:, :k]
+        rows = np.take_along_axis(best_rows, order, axis=1)
+        scores = np.take_along_axis(best_scores, order, axis=1)
+        return [list(zip(r.tolist(), s.tolist())) for r, s in zip(rows, scores)]
+
+    # -------------------- IVF --------------------
+    def build_ivf(self, nlist=None, iterations=8, sample=50_000, seed=0):
+        """Partition the current rows with spherical k-means"""
+        with self.lock:
+            count = len(self.offsets)
+            nlist = nlist or max(16, int(np.sqrt(count)))
+            rng = np.random.default_rng(seed)
+            training = self.matrix[np.sort(rng.choice(count, size=min(sample, count), replace=False))]
+            centroids = training[rng.choice(len(training), size=min(nlist, len(training)), replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(training @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, training)
+                norms = np.linalg.norm(sums, axis=1)
+                filled = norms > 0  # empty partitions keep their old centroid
+                centroids[filled] = sums[filled] / norms[filled, None]
+
+            assign = np.empty(count, dtype=np.int64)
+            for lo in range(0, count, 65_536):
+                hi = min(lo + 65_536, count)
+                assign[lo:hi] = np.argmax(self.matrix[lo:hi] @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+            self.ivf = {"centroids": centroids, "order": order, "bounds": bounds, "count": count}
+
+    def search_ivf(self, query, k, count):
+        ivf = self.ivf
+        probes = np.argsort(-(ivf["centroids"] @ query))[:self.nprobe]
+        candidates = np.concatenate([ivf["order"][ivf["bounds"][c]:ivf["bounds"][c + 1]] for c in probes])
+        candidates.sort()  # sequential reads from the memory map
+        results = []
+        if len(candidates):
+            scores = self.matrix[candidates] @ query
+            top = min(k, len(candidates))
+            idx = np.argpartition(-scores, top - 1)[:top]
+            results = list(zip(candidates[idx].tolist(), scores[idx].tolist()))
+        # Rows added since the index was built are searched exactly
+        if count > ivf["count"]:
+            results += self.search_exact(query[None, :], k, ivf["count"], count)[0]
+        return sorted(results, key=lambda item: -item[1])[:k]
+
+    def close(self):
+        with self.lock:
+            if self.matrix is not None:
+                self.matrix.flush()
+            self.sidecar.close()
+
+# -------------------- SEMANTIC CACHE --------------------
+class SemanticCache:
+    """Answer near-duplicate prompts from earlier answers.
+
+    Similar wording is not enough: the earlier prompt must also have the same
+    numbers in the same order, the same operators and symbols and the same
+    negations, since "15 + 27" vs "15 * 27" or "safe" vs "not safe" need
+    different answers however close their vectors are.
+    """
+
+    NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+    SYMBOL = re.compile(r"[" + re.escape(HashingEmbedder.SYMBOLS) + "]")
+    NEGATION = re.compile(r"\b(?:not|no|never|none|nothing|nobody|neither|nor|without|cannot)\b|n['’]?t\b")
+
+    def __init__(self, store, threshold=0.95, candidates=3):
+        self.store = store
+        self.threshold = threshold
+        self.candidates = candidates
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def signature(cls, prompt):
+        lowered = prompt.lower()
+        return (cls.NUMBER.findall(lowered), sorted(cls.SYMBOL.findall(lowered)),
+                len(cls.NEGATION.findall(lowered)))
+
+    def lookup(self, prompt):
+        signature = self.signature(prompt)
+        for row, score in self.store.search([prompt], k=self.candidates)[0]:
+            if score < self.threshold:
+                break
+            text, answer = self.store.get(row)
+            if self.signature(text) == signature:
+                self.hits += 1
+                return answer
+        self.misses += 1
+        return None
+
+    def add(self, prompt, answer):
+        self.store.add([prompt], [answer])
+
+# -------------------- KNOWLEDGE BASE --------------------
+class KnowledgeBase:
+    """Snippets retrieved by similarity and added to the prompt (RAG)"""
+
+    def __init__(self, store, min_score=0.3):
+        self.store = store
+        self.min_score = min_score
+
+    def retrieve(self, query, k=3):
+        results = self.store.search([query], k=k)[0]
+        return [self.store.get(row)[0] for row, score in results if score >= self.min_score]
+
+    def ingest(self, paths):
+        """Add every paragraph of the given text files; returns how many were added"""
+        added = 0
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                paragraphs = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+            for i in range(0, len(paragraphs), 256):
+                batch = paragraphs[i:i + 256]
+                self.store.add(batch, [os.path.basename(path)] * len(batch))
+                added += len(batch)
+        return added
+
+if __name__ == "__main__":
+    # Usage: python vectorstore.py ingest notes.txt faq.txt
+    if len(sys.argv) < 3 or sys.argv[1] != "ingest":
+        print("Usage: python vectorstore.py ingest FILE [FILE ...]")
+        sys.exit(1)
+    store = VectorStore(os.path.join("vectors", "knowledge"))
+    print(f"Added {KnowledgeBase(store).ingest(sys.argv[2:])} snippets")
+    store.close()